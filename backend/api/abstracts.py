@@ -1,7 +1,168 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 
+from api.metrics import record_serializer
+
 
 class RecipeUserSerializer(Serializer):
 
     class Meta:
         fields = ('user', 'recipe')
+
+
+class SerializerMetricsMixin:
+
+    def get_serializer(self, *args, **kwargs):
+        return record_serializer(super().get_serializer(*args, **kwargs))
+
+
+class CursorPaginationMixin:
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            if self.cursor_pagination_class is not None and (
+                self.cursor_pagination_class.cursor_query_param
+                in self.request.query_params
+            ):
+                pagination_class = self.cursor_pagination_class
+            self._paginator = pagination_class()
+        return self._paginator
+
+
+class AsyncReadViewSetMixin:
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_VIEWS:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            action = actions.get(request.method.lower())
+            if action not in cls.async_actions:
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            return await self.adispatch(request, *args, **kwargs)
+
+        async_view.cls = cls
+        async_view.initkwargs = initkwargs
+        async_view.actions = actions
+        return csrf_exempt(async_view)
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+
+class ResponseCacheViewSetMixin:
+    response_cache = None
+    cached_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (self.action not in self.cached_actions
+                or not self.response_cache.is_cacheable(request)):
+            return
+        self.get = self._get_cached_handler(getattr(self, self.action))
+        async_handler = getattr(self, f'a{self.action}', None)
+        if async_handler is not None:
+            setattr(
+                self, f'a{self.action}',
+                self._aget_cached_handler(async_handler)
+            )
+
+    def _get_cached_handler(self, handler):
+        response_cache = self.response_cache
+
+        @wraps(handler)
+        def cached_handler(request, *args, **kwargs):
+            key, item = response_cache.get(request)
+            if item is not None:
+                return response_cache.get_response(request, item)
+            response = handler(request, *args, **kwargs)
+            response_cache.store(key, response)
+            return response
+
+        return cached_handler
+
+    def _aget_cached_handler(self, handler):
+        response_cache = self.response_cache
+
+        @wraps(handler)
+        async def cached_handler(request, *args, **kwargs):
+            key, item = await response_cache.aget(request)
+            if item is not None:
+                return response_cache.get_response(request, item)
+            response = await handler(request, *args, **kwargs)
+            await response_cache.astore(key, response)
+            return response
+
+        return cached_handler
+
+
+class CatalogueViewSetMixin:
+    catalogue = None
+
+    def is_catalogue_request(self, request):
+        return True
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_catalogue_request(request):
+            return super().list(request, *args, **kwargs)
+        return self._get_catalogue_response(request, self.catalogue.state)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._get_item_response(self.catalogue.state)
+
+    async def alist(self, request, *args, **kwargs):
+        if not self.is_catalogue_request(request):
+            return await sync_to_async(super().list)(request, *args, **kwargs)
+        return self._get_catalogue_response(
+            request, await self.catalogue.aget_state()
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return self._get_item_response(await self.catalogue.aget_state())
+
+    def _get_catalogue_response(self, request, state):
+        if state.etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return HttpResponseNotModified(headers={'ETag': state.etag})
+        return HttpResponse(
+            state.content,
+            content_type='application/json',
+            headers={'ETag': state.etag}
+        )
+
+    def _get_item_response(self, state):
+        pk = self.kwargs[self.lookup_field]
+        item = state.items.get(int(pk)) if pk.isdigit() else None
+        if item is None:
+            raise NotFound()
+        return Response(item)
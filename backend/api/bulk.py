@@ -0,0 +1,179 @@
+import json
+import time
+from operator import itemgetter
+from pathlib import PurePosixPath
+from urllib.parse import urlsplit
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save
+from rest_framework.exceptions import ValidationError
+
+from api.documents import save_recipe_documents
+from api.serializers import CreateRecipeSerializer, RecipeDocumentSerializer
+from foodgram.constants import (RECIPE_DOCUMENTS_CHUNK_SIZE,
+                                RECIPE_IMPORT_CHUNK_SIZE)
+from recipes.models import Recipe, RecipeIngredient
+
+RELATED_FIELDS = ('tags', 'ingredients')
+
+
+def send_created_signals(instances):
+    for instance in instances:
+        post_save.send(
+            sender=type(instance), instance=instance, created=True,
+            update_fields=None, raw=False, using=instance._state.db
+        )
+
+
+def send_m2m_added_signals(instance, field_name, pk_set):
+    field = type(instance)._meta.get_field(field_name)
+    for action in ('pre_add', 'post_add'):
+        m2m_changed.send(
+            sender=field.remote_field.through, instance=instance,
+            action=action, reverse=False, model=field.related_model,
+            pk_set=pk_set, using=instance._state.db
+        )
+
+
+class RecipeImporter:
+
+    def __init__(self, author, images=None,
+                 chunk_size=RECIPE_IMPORT_CHUNK_SIZE):
+        self.author = author
+        self.images = images
+        self.image_names = {}
+        if images is not None:
+            for name in images.namelist():
+                if not name.endswith('/'):
+                    self.image_names.setdefault(PurePosixPath(name).name, name)
+                    self.image_names[name] = name
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.errors = []
+
+    def run(self, lines):
+        started = time.monotonic()
+        chunk = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            chunk.append((number, line))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        elapsed = time.monotonic() - started
+        return {
+            'created': self.created,
+            'errors': sorted(self.errors, key=itemgetter('line')),
+            'seconds': round(elapsed, 3),
+            'recipes_per_second': round(self.created / elapsed, 1)
+            if elapsed else 0,
+        }
+
+    def _import_chunk(self, chunk):
+        rows = []
+        for number, line in chunk:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                self._add_error(number, 'Строка не является JSON объектом.')
+                continue
+            rows.append((number, self._prepare_row(row)))
+        serializer = CreateRecipeSerializer(many=True)
+        serializer.resolve([row for _, row in rows])
+        valid = []
+        for number, row in rows:
+            try:
+                valid.append(serializer.child.run_validation(row))
+            except ValidationError as exc:
+                self.errors.append({'line': number, 'errors': exc.detail})
+        if valid:
+            with transaction.atomic():
+                self._create_recipes(valid)
+            self.created += len(valid)
+
+    def _prepare_row(self, row):
+        tags = row.get('tags')
+        if isinstance(tags, list):
+            row['tags'] = [
+                tag.get('id') if isinstance(tag, dict) else tag
+                for tag in tags
+            ]
+        image = row.get('image')
+        if isinstance(image, str) and self.images is not None:
+            name = self.image_names.get(image) or self.image_names.get(
+                PurePosixPath(urlsplit(image).path).name
+            )
+            if name is not None:
+                row['image'] = SimpleUploadedFile(
+                    PurePosixPath(name).name, self.images.read(name)
+                )
+        return row
+
+    def _create_recipes(self, valid):
+        recipes = Recipe.objects.bulk_create([
+            Recipe(author=self.author, **{
+                field: value for field, value in data.items()
+                if field not in RELATED_FIELDS
+            }) for data in valid
+        ])
+        recipe_tags = []
+        recipe_ingredients = []
+        document_serializer = RecipeDocumentSerializer()
+        for recipe, data in zip(recipes, valid):
+            tags = sorted(data['tags'], key=lambda tag: tag.id)
+            ingredients = [
+                RecipeIngredient(recipe=recipe, **ingredient)
+                for ingredient in data['ingredients']
+            ]
+            recipe_tags.extend(
+                Recipe.tags.through(recipe=recipe, tag=tag) for tag in tags
+            )
+            recipe_ingredients.extend(ingredients)
+            recipe.document = document_serializer.to_document(
+                recipe, tags=tags, ingredients=ingredients
+            )
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        send_created_signals(recipes)
+        send_created_signals(recipe_ingredients)
+        for recipe, data in zip(recipes, valid):
+            send_m2m_added_signals(
+                recipe, 'tags', {tag.pk for tag in data['tags']}
+            )
+        save_recipe_documents(recipes)
+
+    def _add_error(self, number, message):
+        self.errors.append({
+            'line': number, 'errors': {'non_field_errors': [message]}
+        })
+
+
+def stream_recipe_export(queryset, get_absolute_url=None):
+    rows = queryset.order_by('id').values_list('id', 'document')
+    for pk, document in rows.iterator(chunk_size=RECIPE_DOCUMENTS_CHUNK_SIZE):
+        if document is None:
+            document = RecipeDocumentSerializer(Recipe.objects.get(pk=pk)).data
+        if get_absolute_url is not None:
+            document = {
+                **document,
+                'author': {
+                    **document['author'],
+                    'avatar': document['author']['avatar']
+                    and get_absolute_url(document['author']['avatar']),
+                    'avatar_renditions': {
+                        rendition: url and get_absolute_url(url)
+                        for rendition, url in document['author'].get(
+                            'avatar_renditions', {}
+                        ).items()
+                    }
+                },
+                'image': document['image']
+                and get_absolute_url(document['image']),
+            }
+        yield json.dumps(document, ensure_ascii=False) + '\n'
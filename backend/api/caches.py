@@ -0,0 +1,109 @@
+import hashlib
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from foodgram.constants import RESPONSE_CACHE_TIMEOUT
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Vary', 'Allow')
+
+
+def is_cache_shared():
+    return not isinstance(caches['default'], LocMemCache)
+
+
+class ResponseCache:
+
+    def __init__(self, name, timeout=RESPONSE_CACHE_TIMEOUT):
+        self.prefix = f'responses:{name}'
+        self.version_key = f'{self.prefix}:version'
+        self.timeout = timeout
+
+    def is_cacheable(self, request):
+        return (
+            request.method == 'GET'
+            and 'Authorization' not in request.headers
+        )
+
+    def get(self, request):
+        key = self._get_key(
+            request, cache.get_or_set(self.version_key, 0, None)
+        )
+        return key, cache.get(key)
+
+    async def aget(self, request):
+        key = self._get_key(
+            request, await cache.aget_or_set(self.version_key, 0, None)
+        )
+        return key, await cache.aget(key)
+
+    def store(self, key, response):
+        if self._is_rendering(response):
+            response.add_post_render_callback(
+                lambda rendered: self._set(key, rendered)
+            )
+        else:
+            self._set(key, response)
+
+    async def astore(self, key, response):
+        if self._is_rendering(response):
+            response.add_post_render_callback(
+                lambda rendered: self._set(key, rendered)
+            )
+            return
+        item = self._dump(response)
+        if item is not None:
+            await cache.aset(key, item, self.timeout)
+
+    def get_response(self, request, item):
+        content, headers = item
+        response = get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(
+                headers.get('Last-Modified', '')
+            )
+        )
+        if response is None:
+            return HttpResponse(content, headers=headers)
+        for header in ('ETag', 'Last-Modified', 'Vary'):
+            if header in headers:
+                response[header] = headers[header]
+        return response
+
+    def invalidate(self):
+        cache.add(self.version_key, 0, None)
+        cache.incr(self.version_key)
+
+    def _get_key(self, request, version):
+        digest = hashlib.md5(
+            f'{request.build_absolute_uri()}\n'
+            f'{request.headers.get("Accept", "")}'.encode()
+        ).hexdigest()
+        return f'{self.prefix}:{version}:{digest}'
+
+    def _is_rendering(self, response):
+        return not getattr(response, 'is_rendered', True)
+
+    def _dump(self, response):
+        if (response.status_code != 200 or response.streaming
+                or response.cookies):
+            return None
+        return response.content, {
+            header: response[header] for header in CACHED_HEADERS
+            if response.has_header(header)
+        }
+
+    def _set(self, key, response):
+        item = self._dump(response)
+        if item is not None:
+            cache.set(key, item, self.timeout)
+
+
+recipe_responses = ResponseCache('recipes')
+tag_responses = ResponseCache('tags')
+ingredient_responses = ResponseCache('ingredients')
+user_responses = ResponseCache('users')
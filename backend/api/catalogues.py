@@ -0,0 +1,95 @@
+import hashlib
+from time import monotonic
+from typing import NamedTuple
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from api.caches import is_cache_shared
+from foodgram.constants import (CATALOGUE_VERSION_CHECK_INTERVAL,
+                                LOCAL_CACHE_STATE_TIMEOUT)
+from recipes.models import Ingredient, Tag
+
+
+class CatalogueState(NamedTuple):
+    version: int
+    items: dict
+    content: bytes
+    etag: str
+    built_at: float
+
+
+class Catalogue:
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.version_key = f'catalogue:{model._meta.label_lower}:version'
+        self._state = None
+        self._checked_at = 0
+
+    @property
+    def state(self):
+        now = monotonic()
+        if not self._is_checked(now):
+            version = cache.get_or_set(self.version_key, 0, None)
+            if not self._is_current(version, now):
+                self._state = self._build(
+                    version, list(self._get_items_queryset())
+                )
+            self._checked_at = now
+        return self._state
+
+    async def aget_state(self):
+        now = monotonic()
+        if not self._is_checked(now):
+            version = await cache.aget_or_set(self.version_key, 0, None)
+            if not self._is_current(version, now):
+                self._state = self._build(version, [
+                    item async for item in self._get_items_queryset()
+                ])
+            self._checked_at = now
+        return self._state
+
+    def get_item(self, pk):
+        return self.state.items.get(pk)
+
+    def invalidate(self):
+        cache.add(self.version_key, 0, None)
+        cache.incr(self.version_key)
+        self._state = None
+
+    def _is_checked(self, now):
+        return (
+            self._state is not None
+            and now - self._checked_at <= CATALOGUE_VERSION_CHECK_INTERVAL
+        )
+
+    def _is_current(self, version, now):
+        return (
+            self._state is not None
+            and self._state.version == version
+            and (
+                is_cache_shared()
+                or now - self._state.built_at <= LOCAL_CACHE_STATE_TIMEOUT
+            )
+        )
+
+    def _get_items_queryset(self):
+        return self.model.objects.order_by('id').values(*self.fields)
+
+    def _build(self, version, items):
+        content = JSONRenderer().render(items)
+        return CatalogueState(
+            version=version,
+            items={item['id']: item for item in items},
+            content=content,
+            etag=f'"{hashlib.md5(content).hexdigest()}"',
+            built_at=monotonic()
+        )
+
+
+tag_catalogue = Catalogue(Tag, ('id', 'name', 'slug'))
+ingredient_catalogue = Catalogue(
+    Ingredient, ('id', 'name', 'measurement_unit')
+)
@@ -0,0 +1,69 @@
+from asgiref.local import Local
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.functions import Now
+
+from api.caches import recipe_responses
+from api.serializers import RecipeDocumentSerializer
+from foodgram.constants import RECIPE_DOCUMENTS_CHUNK_SIZE
+from recipes.models import Recipe, RecipeIngredient, Tag
+
+
+def refresh_recipe_documents(queryset):
+    total = 0
+    recipes = queryset.select_related('author').prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.order_by('id')),
+        Prefetch(
+            'ingredients_in_recipes',
+            queryset=RecipeIngredient.objects.filter(
+                ingredient__isnull=False
+            ).order_by('id')
+        )
+    ).order_by()
+    for recipe in recipes.iterator(chunk_size=RECIPE_DOCUMENTS_CHUNK_SIZE):
+        Recipe.objects.filter(pk=recipe.pk).update(
+            document=RecipeDocumentSerializer(recipe).data,
+            updated_at=Now()
+        )
+        total += 1
+    recipe_responses.invalidate()
+    return total
+
+
+pending_refresh = Local()
+
+
+def get_pending_refresh():
+    if not hasattr(pending_refresh, 'recipe_ids'):
+        pending_refresh.recipe_ids = set()
+    return pending_refresh.recipe_ids
+
+
+def refresh_pending_documents():
+    recipe_ids = get_pending_refresh()
+    if not recipe_ids:
+        return
+    pending_refresh.recipe_ids = set()
+    refresh_recipe_documents(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+def schedule_refresh(recipe_ids):
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    get_pending_refresh().update(recipe_ids)
+    transaction.on_commit(refresh_pending_documents)
+
+
+def save_recipe_documents(recipes):
+    Recipe.objects.bulk_update(recipes, ('document', ))
+    get_pending_refresh().difference_update(recipe.pk for recipe in recipes)
+    transaction.on_commit(recipe_responses.invalidate)
+
+
+def save_recipe_document(recipe):
+    Recipe.objects.filter(pk=recipe.pk).update(
+        document=recipe.document, updated_at=Now()
+    )
+    get_pending_refresh().discard(recipe.pk)
+    transaction.on_commit(recipe_responses.invalidate)
@@ -0,0 +1,109 @@
+from collections.abc import Mapping
+from itertools import chain
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import ImageField
+from rest_framework.relations import (MANY_RELATION_KWARGS, ManyRelatedField,
+                                      PrimaryKeyRelatedField)
+from rest_framework.serializers import ListSerializer
+
+
+class UploadImageField(Base64ImageField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return ImageField.to_internal_value(self, data)
+        return super().to_internal_value(data)
+
+
+class BulkManyRelatedField(ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        self.resolve(data)
+        objects = []
+        errors = []
+        for item in data:
+            try:
+                objects.append(self.child_relation.to_internal_value(item))
+            except ValidationError as exc:
+                errors.extend(exc.detail)
+        if errors:
+            raise ValidationError(errors)
+        return objects
+
+    def resolve(self, values):
+        self.child_relation.resolve(values)
+
+
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.resolved_pks = set()
+        self.resolved = {}
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def resolve(self, values):
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.to_pk(value))
+            except ValidationError:
+                pass
+        missing = pks - self.resolved_pks
+        if missing:
+            self.resolved.update(self.get_queryset().in_bulk(missing))
+            self.resolved_pks |= missing
+
+    def to_pk(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_internal_value(self, data):
+        pk = self.to_pk(data)
+        if pk in self.resolved:
+            return self.resolved[pk]
+        if pk in self.resolved_pks:
+            self.fail('does_not_exist', pk_value=pk)
+        return super().to_internal_value(data)
+
+
+class BulkRelatedListSerializer(ListSerializer):
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.resolve(data)
+        return super().to_internal_value(data)
+
+    def resolve(self, data):
+        items = [item for item in data if isinstance(item, Mapping)]
+        for field in self.child.fields.values():
+            values = [
+                item[field.field_name] for item in items
+                if field.field_name in item
+            ]
+            if isinstance(field, BulkPrimaryKeyRelatedField):
+                field.resolve(values)
+            elif isinstance(field, (BulkManyRelatedField,
+                                    BulkRelatedListSerializer)):
+                field.resolve(chain.from_iterable(
+                    value for value in values if isinstance(value, list)
+                ))
@@ -1,12 +1,39 @@
+from django.db.models import Case, Exists, OuterRef, Value, When
 from django_filters import rest_framework as filters
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import BaseFilterBackend
 
+from api.catalogues import tag_catalogue
+from foodgram.constants import INGREDIENT_SEARCH_LIMIT
 from recipes.models import Recipe
+from recipes.search import search_recipes
 
 
-class IngredientSearchFilter(SearchFilter):
+class IngredientSearchFilter(BaseFilterBackend):
     search_param = 'name'
 
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get(self.search_param, '').strip()
+        if not search:
+            return queryset
+        queryset = queryset.filter(
+            name__icontains=search
+        ).annotate(
+            is_prefix_match=Case(
+                When(name__istartswith=search, then=Value(True)),
+                default=Value(False)
+            )
+        ).order_by('-is_prefix_match', 'name')
+        if view.action == 'list':
+            return queryset[:INGREDIENT_SEARCH_LIMIT]
+        return queryset
+
+
+def get_tag_choices():
+    return [
+        (tag['slug'], tag['name'])
+        for tag in tag_catalogue.state.items.values()
+    ]
+
 
 class RecipeFilterSet(filters.FilterSet):
     is_favorited = filters.BooleanFilter(
@@ -15,8 +42,12 @@ class RecipeFilterSet(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_shopping_cart_recipes'
     )
-    author = filters.AllValuesFilter(field_name='author__id')
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    author = filters.NumberFilter(field_name='author')
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='get_tagged_recipes'
+    )
+    search = filters.CharFilter(method='get_found_recipes')
 
     def get_favorited_recipes(self, queryset, name, value):
         if self.request.user.is_authenticated:
@@ -28,6 +59,22 @@ class RecipeFilterSet(filters.FilterSet):
             return queryset.filter(recipes_in_cart__user=self.request.user)
         return queryset
 
+    def get_tagged_recipes(self, queryset, name, value):
+        tag_ids = [
+            tag['id'] for tag in tag_catalogue.state.items.values()
+            if tag['slug'] in value
+        ]
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'), tag__in=tag_ids
+            )
+        ))
+
+    def get_found_recipes(self, queryset, name, value):
+        return search_recipes(queryset, value).order_by(
+            '-search_rank', '-pub_date', '-id'
+        )
+
     class Meta:
         model = Recipe
         fields = ('author', 'tags')
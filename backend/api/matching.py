@@ -0,0 +1,280 @@
+from collections import defaultdict
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple
+
+from asgiref.local import Local
+from django.core.cache import cache
+from django.db import transaction
+
+from api.caches import is_cache_shared
+from foodgram.constants import (CATALOGUE_VERSION_CHECK_INTERVAL,
+                                LOCAL_CACHE_STATE_TIMEOUT,
+                                RECIPE_DOCUMENTS_CHUNK_SIZE,
+                                RECIPE_MATCH_CHANGES_LIMIT,
+                                RECIPE_MATCH_CHANGES_TIMEOUT)
+from recipes.models import RecipeIngredient
+
+
+def get_bitset(positions, size):
+    bitset = bytearray((size + 7) // 8)
+    for position in positions:
+        bitset[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bitset, 'little')
+
+
+def get_top_positions(bitset, start, stop):
+    if start:
+        low, high = 0, bitset.bit_length()
+        while low < high:
+            middle = (low + high) // 2
+            if (bitset >> middle).bit_count() > start:
+                low = middle + 1
+            else:
+                high = middle
+        bitset &= (1 << low) - 1
+    positions = []
+    while bitset and len(positions) < stop - start:
+        position = bitset.bit_length() - 1
+        positions.append(position)
+        bitset ^= 1 << position
+    return positions
+
+
+def add_to_counter(counter, bitset):
+    for index, bits in enumerate(counter):
+        counter[index] = bits ^ bitset
+        bitset &= bits
+        if not bitset:
+            return
+    counter.append(bitset)
+
+
+def get_equal(counter, value, bitset):
+    if value >> len(counter):
+        return 0
+    for index, bits in enumerate(counter):
+        bitset &= bits if value >> index & 1 else ~bits
+    return bitset
+
+
+class RecipeIngredientIndexState(NamedTuple):
+    version: int
+    recipe_ids: list
+    positions: dict
+    recipe_ingredients: dict
+    postings: dict
+    sizes: dict
+    built_at: float
+
+
+class RecipeMatches:
+
+    def __init__(self, recipe_ids, groups):
+        self.recipe_ids = recipe_ids
+        self.groups = groups
+
+    def __len__(self):
+        return sum(group.bit_count() for group in self.groups)
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        recipe_ids = []
+        for group in self.groups:
+            if stop <= 0:
+                break
+            count = group.bit_count()
+            if start < count:
+                recipe_ids.extend(
+                    self.recipe_ids[position] for position in
+                    get_top_positions(group, start, min(stop, count))
+                )
+            start = max(start - count, 0)
+            stop -= count
+        return recipe_ids
+
+
+class RecipeIngredientIndex:
+
+    def __init__(self):
+        self.prefix = 'recipe_ingredient_index'
+        self.version_key = f'{self.prefix}:version'
+        self.pending = Local()
+        self._state = None
+        self._checked_at = 0
+        self._lock = Lock()
+
+    @property
+    def state(self):
+        now = monotonic()
+        if not self._is_checked(now):
+            with self._lock:
+                version = cache.get_or_set(self.version_key, 0, None)
+                if not self._is_current(version, now):
+                    self._state = self._sync(version)
+                self._checked_at = now
+        return self._state
+
+    def match(self, ingredient_ids, max_missing=0):
+        state = self.state
+        counter = []
+        for ingredient_id in set(ingredient_ids):
+            if ingredient_id in state.postings:
+                add_to_counter(counter, state.postings[ingredient_id])
+        groups = []
+        for missing in range(max_missing + 1):
+            for size in sorted(state.sizes, reverse=True):
+                if size > missing:
+                    group = get_equal(
+                        counter, size - missing, state.sizes[size]
+                    )
+                    if group:
+                        groups.append(group)
+        return RecipeMatches(state.recipe_ids, groups)
+
+    def mark_changed(self, recipe_ids):
+        cache.add(self.version_key, 0, None)
+        version = cache.incr(self.version_key)
+        cache.set(
+            self._get_changes_key(version), set(recipe_ids),
+            RECIPE_MATCH_CHANGES_TIMEOUT
+        )
+
+    def schedule_update(self, recipe_ids):
+        recipe_ids = set(recipe_ids)
+        if not recipe_ids:
+            return
+        self._get_pending().update(recipe_ids)
+        transaction.on_commit(self._mark_pending_changed)
+
+    def _get_pending(self):
+        if not hasattr(self.pending, 'recipe_ids'):
+            self.pending.recipe_ids = set()
+        return self.pending.recipe_ids
+
+    def _mark_pending_changed(self):
+        recipe_ids = self._get_pending()
+        if not recipe_ids:
+            return
+        self.pending.recipe_ids = set()
+        self.mark_changed(recipe_ids)
+
+    def _is_checked(self, now):
+        return (
+            self._state is not None
+            and now - self._checked_at <= CATALOGUE_VERSION_CHECK_INTERVAL
+        )
+
+    def _is_current(self, version, now):
+        return (
+            self._state is not None
+            and self._state.version == version
+            and (
+                is_cache_shared()
+                or now - self._state.built_at <= LOCAL_CACHE_STATE_TIMEOUT
+            )
+        )
+
+    def _get_changes_key(self, version):
+        return f'{self.prefix}:changes:{version}'
+
+    def _sync(self, version):
+        state = self._state
+        if state is not None and (
+            0 < version - state.version <= RECIPE_MATCH_CHANGES_LIMIT
+        ):
+            changes = cache.get_many([
+                self._get_changes_key(number)
+                for number in range(state.version + 1, version + 1)
+            ])
+            if len(changes) == version - state.version:
+                patched = self._patch(
+                    state, version, set().union(*changes.values())
+                )
+                if patched is not None:
+                    return patched
+        return self._build(version)
+
+    def _get_recipe_ingredients(self, **filters):
+        recipe_ingredients = defaultdict(list)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe__isnull=False, ingredient__isnull=False, **filters
+        ).order_by().values_list('recipe', 'ingredient').distinct().iterator(
+            chunk_size=RECIPE_DOCUMENTS_CHUNK_SIZE
+        ):
+            recipe_ingredients[recipe_id].append(ingredient_id)
+        return {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in recipe_ingredients.items()
+        }
+
+    def _build(self, version):
+        recipe_ingredients = self._get_recipe_ingredients()
+        recipe_ids = sorted(recipe_ingredients)
+        ingredient_positions = defaultdict(list)
+        size_positions = defaultdict(list)
+        for position, recipe_id in enumerate(recipe_ids):
+            ingredient_ids = recipe_ingredients[recipe_id]
+            size_positions[len(ingredient_ids)].append(position)
+            for ingredient_id in ingredient_ids:
+                ingredient_positions[ingredient_id].append(position)
+        return RecipeIngredientIndexState(
+            version=version,
+            recipe_ids=recipe_ids,
+            positions={
+                recipe_id: position
+                for position, recipe_id in enumerate(recipe_ids)
+            },
+            recipe_ingredients=recipe_ingredients,
+            postings={
+                ingredient_id: get_bitset(positions, len(recipe_ids))
+                for ingredient_id, positions in ingredient_positions.items()
+            },
+            sizes={
+                size: get_bitset(positions, len(recipe_ids))
+                for size, positions in size_positions.items()
+            },
+            built_at=monotonic()
+        )
+
+    def _patch(self, state, version, recipe_ids):
+        fresh = self._get_recipe_ingredients(recipe__in=recipe_ids)
+        recipe_id_list = list(state.recipe_ids)
+        positions = dict(state.positions)
+        recipe_ingredients = dict(state.recipe_ingredients)
+        postings = dict(state.postings)
+        sizes = dict(state.sizes)
+        for recipe_id in sorted(recipe_ids):
+            position = positions.get(recipe_id)
+            if position is None:
+                if recipe_id not in fresh:
+                    continue
+                if recipe_id_list and recipe_id < recipe_id_list[-1]:
+                    return None
+                position = len(recipe_id_list)
+                positions[recipe_id] = position
+                recipe_id_list.append(recipe_id)
+            bit = 1 << position
+            old = recipe_ingredients.pop(recipe_id, ())
+            new = fresh.get(recipe_id, ())
+            if old:
+                sizes[len(old)] &= ~bit
+            for ingredient_id in old:
+                postings[ingredient_id] &= ~bit
+            if new:
+                recipe_ingredients[recipe_id] = new
+                sizes[len(new)] = sizes.get(len(new), 0) | bit
+            for ingredient_id in new:
+                postings[ingredient_id] = postings.get(ingredient_id, 0) | bit
+        return RecipeIngredientIndexState(
+            version=version,
+            recipe_ids=recipe_id_list,
+            positions=positions,
+            recipe_ingredients=recipe_ingredients,
+            postings=postings,
+            sizes=sizes,
+            built_at=state.built_at
+        )
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
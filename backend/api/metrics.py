@@ -0,0 +1,200 @@
+import logging
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram.constants import METRICS_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+MICROSECONDS = 1_000_000
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.started_at = perf_counter()
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.json_time = 0
+
+    @property
+    def total_time(self):
+        return perf_counter() - self.started_at
+
+    def get_server_timing(self, total_time):
+        app_time = (
+            total_time - self.db_time - self.serializer_time - self.json_time
+        )
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'json;dur={self.json_time * 1000:.1f}',
+            f'app;dur={app_time * 1000:.1f}',
+            f'total;dur={total_time * 1000:.1f}',
+        ))
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started_at = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += perf_counter() - started_at
+
+
+def record_serializer(serializer):
+    to_representation = serializer.to_representation
+
+    @wraps(to_representation)
+    def timed_to_representation(instance):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return to_representation(instance)
+        started_at = perf_counter()
+        try:
+            return to_representation(instance)
+        finally:
+            metrics.serializer_time += perf_counter() - started_at
+
+    serializer.to_representation = timed_to_representation
+    return serializer
+
+
+def get_view_name(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    view = getattr(match.func, 'cls', match.func)
+    actions = getattr(match.func, 'actions', None) or {}
+    method = request.method.lower()
+    return f'{view.__name__}.{actions.get(method, method)}'
+
+
+def check_query_budget(view_name, queries):
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is None or queries <= budget:
+        return True
+    message = (
+        f'Превышен бюджет запросов к БД для {view_name}: '
+        f'{queries} из {budget}'
+    )
+    if settings.QUERY_BUDGET_RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+    return False
+
+
+class MetricsRegistry:
+    counters = (
+        ('requests_total', 'Обработано запросов', 1),
+        ('db_queries_total', 'Выполнено запросов к БД', 1),
+        ('db_seconds_total', 'Время запросов к БД', MICROSECONDS),
+        ('serializer_seconds_total', 'Время сериализации', MICROSECONDS),
+        ('json_seconds_total', 'Время рендеринга JSON', MICROSECONDS),
+        (
+            'request_seconds_total', 'Полное время обработки запросов',
+            MICROSECONDS
+        ),
+        ('response_bytes_total', 'Размер ответов', 1),
+        (
+            'query_budget_exceeded_total', 'Превышений бюджета запросов к БД',
+            1
+        ),
+    )
+
+    def __init__(self, prefix, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.prefix = prefix
+        self.views_key = f'metrics:{prefix}:views'
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._flushed_at = monotonic()
+        self._lock = Lock()
+
+    def observe(self, view_name, metrics, total_time, size, within_budget):
+        values = (
+            1, metrics.queries, metrics.db_time, metrics.serializer_time,
+            metrics.json_time, total_time, size, int(not within_budget)
+        )
+        with self._lock:
+            totals = self._pending.setdefault(
+                view_name, [0] * len(self.counters)
+            )
+            for index, value in enumerate(values):
+                totals[index] += value
+            if monotonic() - self._flushed_at < self.flush_interval:
+                return
+            pending = self._take_pending()
+        self._flush(pending)
+
+    def get_totals(self):
+        with self._lock:
+            pending = self._take_pending()
+        self._flush(pending)
+        view_names = sorted(cache.get(self.views_key, ()))
+        values = cache.get_many([
+            self._get_key(view_name, counter)
+            for view_name in view_names for counter, _, _ in self.counters
+        ])
+        return {
+            view_name: [
+                self._get_value(values, view_name, counter, scale)
+                for counter, _, scale in self.counters
+            ] for view_name in view_names
+        }
+
+    def render(self):
+        views = self.get_totals()
+        lines = []
+        for index, (counter, description, _) in enumerate(self.counters):
+            name = f'{self.prefix}_{counter}'
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for view_name, totals in views.items():
+                lines.append(f'{name}{{view="{view_name}"}} {totals[index]}')
+        return '\n'.join(lines) + '\n'
+
+    def _take_pending(self):
+        pending = self._pending
+        self._pending = {}
+        self._flushed_at = monotonic()
+        return pending
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        view_names = cache.get(self.views_key, set())
+        if not pending.keys() <= view_names:
+            cache.set(self.views_key, view_names | pending.keys(), None)
+        for view_name, totals in pending.items():
+            for (counter, _, scale), value in zip(self.counters, totals):
+                value = round(value * scale)
+                if value:
+                    key = self._get_key(view_name, counter)
+                    cache.add(key, 0, None)
+                    cache.incr(key, value)
+
+    def _get_value(self, values, view_name, counter, scale):
+        value = values.get(self._get_key(view_name, counter), 0)
+        return value if scale == 1 else value / scale
+
+    def _get_key(self, view_name, counter):
+        return f'metrics:{self.prefix}:{view_name}:{counter}'
+
+
+registry = MetricsRegistry('foodgram')
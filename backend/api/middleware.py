@@ -0,0 +1,102 @@
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from api.metrics import (RequestMetrics, check_query_budget, current_metrics,
+                         get_view_name, registry)
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.process_response(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.process_response(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            started_at = perf_counter()
+            response.render()
+            metrics.json_time += perf_counter() - started_at
+        return response
+
+    def process_response(self, request, response, metrics):
+        if response.streaming:
+            self._wrap_streaming_content(request, response, metrics)
+            return response
+        total_time = metrics.total_time
+        self._observe(request, metrics, total_time, len(response.content))
+        if self._is_timing_visible(request):
+            response['Server-Timing'] = metrics.get_server_timing(total_time)
+        return response
+
+    def _observe(self, request, metrics, total_time, size):
+        view_name = get_view_name(request)
+        within_budget = check_query_budget(view_name, metrics.queries)
+        registry.observe(view_name, metrics, total_time, size, within_budget)
+
+    def _is_timing_visible(self, request):
+        if settings.DEBUG or getattr(request, 'auth', None) is not None:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def _wrap_streaming_content(self, request, response, metrics):
+        content = response.streaming_content
+        size = 0
+        if response.is_async:
+            async def wrapped():
+                nonlocal size
+                iterator = aiter(content)
+                while True:
+                    token = current_metrics.set(metrics)
+                    try:
+                        chunk = await anext(iterator)
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        current_metrics.reset(token)
+                    size += len(chunk)
+                    yield chunk
+                self._observe(request, metrics, metrics.total_time, size)
+        else:
+            def wrapped():
+                nonlocal size
+                iterator = iter(content)
+                while True:
+                    token = current_metrics.set(metrics)
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        break
+                    finally:
+                        current_metrics.reset(token)
+                    size += len(chunk)
+                    yield chunk
+                self._observe(request, metrics, metrics.total_time, size)
+        response.streaming_content = wrapped()
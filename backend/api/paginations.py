@@ -1,4 +1,7 @@
-from rest_framework.pagination import PageNumberPagination
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from foodgram.constants import PAGINATION_PAGE_SIZE
 
@@ -6,3 +9,41 @@ from foodgram.constants import PAGINATION_PAGE_SIZE
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = PAGINATION_PAGE_SIZE
     page_size_query_param = 'limit'
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return [item async for item in self.page.object_list]
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = PAGINATION_PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return await sync_to_async(self.paginate_queryset)(
+            queryset, request, view
+        )
+
+
+class UserCursorPagination(RecipeCursorPagination):
+    ordering = ('-id', )
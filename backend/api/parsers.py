@@ -0,0 +1,29 @@
+import mimetypes
+
+from rest_framework.parsers import DataAndFiles, FileUploadParser
+
+
+class RawImageParser(FileUploadParser):
+    media_type = 'image/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        data_and_files = super().parse(stream, media_type, parser_context)
+        field_name = parser_context['view'].raw_upload_field
+        return DataAndFiles({}, {field_name: data_and_files.files['file']})
+
+    def get_filename(self, stream, media_type, parser_context):
+        file_name = super().get_filename(stream, media_type, parser_context)
+        if file_name:
+            return file_name
+        extension = mimetypes.guess_extension(media_type.split(';')[0])
+        return f'upload{extension or ""}'
+
+
+class NdjsonParser(FileUploadParser):
+    media_type = 'application/x-ndjson'
+
+    def get_filename(self, stream, media_type, parser_context):
+        return (
+            super().get_filename(stream, media_type, parser_context)
+            or 'import.ndjson'
+        )
@@ -0,0 +1,23 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class CartFileRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class TxtCartRenderer(CartFileRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CsvCartRenderer(CartFileRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JsonCartRenderer(CartFileRenderer):
+    media_type = 'application/json'
+    format = 'json'
@@ -1,11 +1,15 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator
 from djoser.serializers import UserSerializer as BaseUserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from api.abstracts import RecipeUserSerializer
-from foodgram.constants import MIN_INGREDIENT_AMOUNT
+from api.catalogues import ingredient_catalogue, tag_catalogue
+from api.fields import (BulkPrimaryKeyRelatedField, BulkRelatedListSerializer,
+                        UploadImageField)
+from foodgram.constants import (IMAGE_RENDITIONS, MIN_INGREDIENT_AMOUNT,
+                                RECIPE_MATCH_MAX_INGREDIENTS)
 from recipes.models import (Cart, Favourite, Ingredient, Recipe,
                             RecipeIngredient, Tag)
 from users.models import Subscribe
@@ -40,7 +44,7 @@ class CreateUserSerializer(serializers.ModelSerializer):
 
 
 class AvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField(required=True)
+    avatar = UploadImageField(required=True)
 
     class Meta:
         model = User
@@ -58,31 +62,68 @@ class AvatarSerializer(serializers.ModelSerializer):
         return value
 
 
+class ImageRenditionsField(serializers.Field):
+
+    def __init__(self, image_field='image', **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        renditions = getattr(instance, f'{self.image_field}_renditions')
+        request = self.context.get('request')
+        result = {}
+        for rendition in IMAGE_RENDITIONS:
+            url = (
+                default_storage.url(renditions[rendition])
+                if rendition in renditions
+                else image.url if image else None
+            )
+            if request is not None and url:
+                url = request.build_absolute_uri(url)
+            result[rendition] = url
+        return result
+
+
 class UserSerializer(BaseUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
+    avatar_renditions = ImageRenditionsField(image_field='avatar')
 
     class Meta(BaseUserSerializer.Meta):
         model = User
         fields = (
             BaseUserSerializer.Meta.fields
-            + ('username', 'is_subscribed', 'avatar')
+            + ('username', 'is_subscribed', 'avatar', 'avatar_renditions')
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        return Subscribe.objects.filter(
-            user=user.id, subscribe_to=obj.id).exists()
+        return obj.id in self._get_subscribed_ids()
+
+    def _get_subscribed_ids(self):
+        if 'subscribed_ids' not in self.context:
+            user = self.context.get('request').user
+            self.context['subscribed_ids'] = (
+                set() if user.is_anonymous
+                else set(Subscribe.objects.filter(
+                    user=user
+                ).values_list('subscribe_to', flat=True))
+            )
+        return self.context['subscribed_ids']
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'cooking_time', 'image')
+        fields = ('id', 'name', 'cooking_time', 'image', 'image_renditions')
 
 
 class UserSubscribeSerializer(UserSerializer):
     recipes = RecipeShortSerializer(
+        source='recipes_preview',
         read_only=True,
         many=True
     )
@@ -92,15 +133,6 @@ class UserSubscribeSerializer(UserSerializer):
         model = User
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        request = self.context.get('request', False)
-        if request and not request.user.is_anonymous:
-            recipes_limit = request.query_params.get('recipes_limit')
-            if isinstance(recipes_limit, str) and recipes_limit.isnumeric():
-                data['recipes'] = data['recipes'][:int(recipes_limit)]
-            return data
-
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -109,7 +141,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         source='ingredient',
         queryset=Ingredient.objects.all()
     )
@@ -120,13 +152,15 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = BulkRelatedListSerializer
 
     def to_representation(self, instance):
-        ingredient_data = IngredientSerializer().to_representation(
-            instance.ingredient
-        )
-        ingredient_data['amount'] = instance.amount
-        return ingredient_data
+        ingredient_data = ingredient_catalogue.get_item(instance.ingredient_id)
+        if ingredient_data is None:
+            ingredient_data = IngredientSerializer().to_representation(
+                instance.ingredient
+            )
+        return {**ingredient_data, 'amount': instance.amount}
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -134,6 +168,12 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('__all__')
 
+    def to_representation(self, instance):
+        tag_data = tag_catalogue.get_item(instance.id)
+        if tag_data is None:
+            return super().to_representation(instance)
+        return tag_data
+
 
 class ReadRecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
@@ -143,6 +183,7 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
         source='ingredients_in_recipes'
     )
 
+    image_renditions = ImageRenditionsField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -150,9 +191,50 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_renditions', 'text', 'cooking_time')
+
+    def to_representation(self, instance):
+        if instance.document is None:
+            return super().to_representation(instance)
+        author_field = self.fields['author']
+        author = instance.document['author']
+        data = {
+            **instance.document,
+            'author': {
+                **author,
+                'avatar': self._get_absolute_url(author['avatar']),
+                'avatar_renditions': {
+                    rendition: self._get_absolute_url(
+                        author.get('avatar_renditions', {}).get(
+                            rendition, author['avatar']
+                        )
+                    ) for rendition in IMAGE_RENDITIONS
+                },
+                'is_subscribed': (
+                    author['id'] in author_field._get_subscribed_ids()
+                )
+            },
+            'image': self._get_absolute_url(instance.document['image']),
+            'image_renditions': self.fields[
+                'image_renditions'
+            ].to_representation(instance),
+            'is_favorited': self.get_is_favorited(instance),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(instance)
+        }
+        data['author'] = {
+            field: data['author'][field] for field in author_field.Meta.fields
+        }
+        return {field: data[field] for field in self.Meta.fields}
+
+    def _get_absolute_url(self, url):
+        request = self.context.get('request')
+        if request is None or not url:
+            return url
+        return request.build_absolute_uri(url)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -160,6 +242,8 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
             user=user, recipe=obj.id).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -167,20 +251,82 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
             user=user, recipe=obj.id).exists()
 
 
+class RecipeMatchSerializer(ReadRecipeSerializer):
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        ingredient_ids = self.context['ingredient_ids']
+        data['missing_ingredients'] = [
+            ingredient for ingredient in data['ingredients']
+            if ingredient['id'] not in ingredient_ids
+        ]
+        return data
+
+
+class RecipeMatchParamsSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_MATCH_MAX_INGREDIENTS
+    )
+    max_missing = serializers.IntegerField(min_value=0, default=0)
+
+
+class AuthorDocumentSerializer(UserSerializer):
+
+    class Meta(UserSerializer.Meta):
+        fields = tuple(
+            field for field in UserSerializer.Meta.fields
+            if field != 'is_subscribed'
+        )
+
+
+class RecipeDocumentSerializer(ReadRecipeSerializer):
+    author = AuthorDocumentSerializer()
+
+    class Meta(ReadRecipeSerializer.Meta):
+        fields = tuple(
+            field for field in ReadRecipeSerializer.Meta.fields
+            if field not in ('is_favorited', 'is_in_shopping_cart',
+                             'image_renditions')
+        )
+
+    def to_representation(self, instance):
+        return super(ReadRecipeSerializer, self).to_representation(instance)
+
+    def to_document(self, recipe, **related):
+        document = recipe.document or {}
+        data = {}
+        for field in self._readable_fields:
+            name = field.field_name
+            if name in related:
+                data[name] = field.to_representation(related[name])
+            elif isinstance(field, serializers.BaseSerializer) and (
+                name in document
+            ):
+                data[name] = document[name]
+            else:
+                data[name] = field.to_representation(
+                    field.get_attribute(recipe)
+                )
+        return data
+
+
 class CreateRecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
         allow_empty=False
     )
     ingredients = RecipeIngredientSerializer(many=True, allow_empty=False)
-    image = Base64ImageField(required=True)
+    image = UploadImageField(required=True)
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'name', 'image', 'text', 'cooking_time')
+        list_serializer_class = BulkRelatedListSerializer
 
     def validate_image(self, value):
         if value is None:
@@ -194,17 +340,14 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             if not field_data:
                 raise serializers.ValidationError(f'Нет поля {field}.')
 
-        unique_tags = []
-        for tag in attrs['tags']:
-            if tag in unique_tags:
-                raise serializers.ValidationError('Не уникальный Тег.')
-            unique_tags.append(tag)
+        if len({tag.id for tag in attrs['tags']}) != len(attrs['tags']):
+            raise serializers.ValidationError('Не уникальный Тег.')
 
-        unique_ingredients = []
-        for ingredient in attrs['ingredients']:
-            if ingredient['ingredient'] in unique_ingredients:
-                raise serializers.ValidationError('Не уникальный Ингредиент.')
-            unique_ingredients.append(ingredient['ingredient'])
+        ingredient_ids = {
+            ingredient['ingredient'].id for ingredient in attrs['ingredients']
+        }
+        if len(ingredient_ids) != len(attrs['ingredients']):
+            raise serializers.ValidationError('Не уникальный Ингредиент.')
 
         return super().validate(attrs)
 
@@ -216,33 +359,96 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         validated_data['author'] = request.user
 
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags_data)
-
-        self._create_ingredients(recipe, ingredients_data)
+        recipe.is_favorited = recipe.is_in_shopping_cart = False
+        recipe.document = RecipeDocumentSerializer().to_document(
+            recipe,
+            tags=self._set_tags(recipe, tags_data),
+            ingredients=self._set_ingredients(recipe, ingredients_data)
+        )
         return recipe
 
     def update(self, instance, validated_data):
-        tags_data = validated_data.pop('tags', False)
+        related = {}
+        tags_data = validated_data.pop('tags', None)
         if tags_data:
-            instance.tags.set(tags_data)
+            related['tags'] = self._set_tags(
+                instance, tags_data, set(Recipe.tags.through.objects.filter(
+                    recipe=instance
+                ).values_list('tag_id', flat=True))
+            )
 
-        ingredients_data = validated_data.pop('ingredients', False)
+        ingredients_data = validated_data.pop('ingredients', None)
         if ingredients_data:
-            instance.ingredients.clear()
-            self._create_ingredients(instance, ingredients_data)
+            related['ingredients'] = self._set_ingredients(
+                instance, ingredients_data,
+                instance.ingredients_in_recipes.all()
+            )
 
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        instance.document = RecipeDocumentSerializer().to_document(
+            instance, **related
+        )
+        return instance
+
+    def _set_tags(self, recipe, tags_data, current_ids=frozenset()):
+        tag_ids = {tag.id for tag in tags_data}
+        removed_ids = current_ids - tag_ids
+        if removed_ids:
+            Recipe.tags.through.objects.filter(
+                recipe=recipe, tag_id__in=removed_ids
+            ).delete()
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for tag in tags_data if tag.id not in current_ids
+        ])
+        return sorted(tags_data, key=lambda tag: tag.id)
+
+    def _set_ingredients(self, recipe, ingredients_data, current=()):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in current
+        }
+        kept = []
+        created = []
+        changed = []
+        for ingredient in ingredients_data:
+            recipe_ingredient = current.pop(ingredient['ingredient'].id, None)
+            if recipe_ingredient is None:
+                recipe_ingredient = RecipeIngredient(
+                    recipe=recipe, amount=ingredient['amount']
+                )
+                created.append(recipe_ingredient)
+            else:
+                if recipe_ingredient.amount != ingredient['amount']:
+                    recipe_ingredient.amount = ingredient['amount']
+                    changed.append(recipe_ingredient)
+                kept.append(recipe_ingredient)
+            recipe_ingredient.ingredient = ingredient['ingredient']
+        if current:
+            RecipeIngredient.objects.filter(pk__in=[
+                recipe_ingredient.pk for recipe_ingredient in current.values()
+            ]).delete()
+        RecipeIngredient.objects.bulk_update(changed, ('amount', ))
+        RecipeIngredient.objects.bulk_create(created)
+        return sorted(kept, key=lambda item: item.id) + created
 
-    def _create_ingredients(self, recipe, ingredients_data):
-        recipe_ingredients = [
-            RecipeIngredient(
-                recipe=recipe,
-                ingredient=ingredient['ingredient'],
-                amount=ingredient['amount']
-            )
-            for ingredient in ingredients_data
-        ]
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+    def to_representation(self, instance):
+        return ReadRecipeSerializer(
+            context=self.context
+        ).to_representation(instance)
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    image = UploadImageField(required=True)
+
+    class Meta:
+        model = Recipe
+        fields = ('image', )
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        instance.document = RecipeDocumentSerializer().to_document(instance)
+        return instance
 
     def to_representation(self, instance):
         return ReadRecipeSerializer(
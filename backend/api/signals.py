@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from api.caches import (ingredient_responses, recipe_responses, tag_responses,
+                        user_responses)
+from api.catalogues import ingredient_catalogue, tag_catalogue
+from api.documents import schedule_refresh
+from api.matching import recipe_ingredient_index
+from api.metrics import record_query
+from api.serializers import AuthorDocumentSerializer, UserSerializer
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+AUTHOR_DOCUMENT_FIELDS = set(AuthorDocumentSerializer.Meta.fields)
+USER_FIELDS = set(UserSerializer.Meta.fields)
+
+
+@receiver(connection_created)
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_catalogue(**kwargs):
+    transaction.on_commit(tag_catalogue.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_catalogue(**kwargs):
+    transaction.on_commit(ingredient_catalogue.invalidate)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_saved_recipe_document(instance, **kwargs):
+    schedule_refresh((instance.pk, ))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def refresh_tagged_recipe_documents(instance, action, reverse, pk_set,
+                                    **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_refresh((instance.pk, ))
+    elif pk_set:
+        schedule_refresh(pk_set)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def refresh_recipe_ingredient_document(instance, **kwargs):
+    if instance.recipe_id is not None:
+        schedule_refresh((instance.recipe_id, ))
+
+
+@receiver(post_save, sender=User)
+def refresh_author_recipe_documents(instance, update_fields, **kwargs):
+    if update_fields and not AUTHOR_DOCUMENT_FIELDS & set(update_fields):
+        return
+    schedule_refresh(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def refresh_catalogue_recipe_documents(sender, instance, **kwargs):
+    schedule_refresh(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_responses(**kwargs):
+    transaction.on_commit(recipe_responses.invalidate)
+
+
+@receiver(post_delete, sender=Recipe)
+def update_deleted_recipe_matching(instance, **kwargs):
+    recipe_ingredient_index.schedule_update((instance.pk, ))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_recipe_ingredient_matching(instance, **kwargs):
+    if instance.recipe_id is not None:
+        recipe_ingredient_index.schedule_update((instance.recipe_id, ))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def update_ingredient_recipes_matching(instance, **kwargs):
+    recipe_ingredient_index.schedule_update(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_responses(**kwargs):
+    transaction.on_commit(tag_responses.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_responses(**kwargs):
+    transaction.on_commit(ingredient_responses.invalidate)
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_user_responses(update_fields=None, **kwargs):
+    if update_fields and not USER_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(user_responses.invalidate)
@@ -0,0 +1,422 @@
+import base64
+import json
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from rest_framework.throttling import AnonRateThrottle
+
+from api.documents import refresh_recipe_documents
+from api.matching import recipe_ingredient_index
+from api.metrics import MetricsRegistry, RequestMetrics, registry
+from recipes.images import process_renditions
+from recipes.models import (Cart, Favourite, Ingredient, Recipe,
+                            RecipeIngredient, Tag)
+from recipes.search import update_search_index
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class RecipeTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com',
+            first_name='Читатель', last_name='Рецептов', password='password'
+        )
+        cls.tags = Tag.objects.bulk_create([
+            Tag(name=f'Тег {number}', slug=f'tag-{number}')
+            for number in range(3)
+        ])
+        cls.ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(5)
+        ])
+        cls.recipes = []
+        for number in range(10):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}',
+                text='Описание', cooking_time=10, image='recipes/image.png'
+            )
+            recipe.tags.set(cls.tags[:number % 3 + 1])
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=100
+                ) for ingredient in cls.ingredients[:number % 5 + 1]
+            ])
+            cls.recipes.append(recipe)
+        refresh_recipe_documents(Recipe.objects.all())
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous_client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.credentials(HTTP_AUTHORIZATION=(
+            f'Token {Token.objects.get_or_create(user=self.user)[0].key}'
+        ))
+
+
+class RecipeQueryCountTest(RecipeTestCase):
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Favourite.objects.bulk_create([
+            Favourite(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::2]
+        ])
+        Cart.objects.bulk_create([
+            Cart(user=cls.user, recipe=recipe) for recipe in cls.recipes[::3]
+        ])
+        Subscribe.objects.create(user=cls.user, subscribe_to=cls.author)
+
+    def test_anonymous_list(self):
+        with self.assertNumQueries(3):
+            response = self.anonymous_client.get(self.url, {'limit': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_authenticated_list(self):
+        with self.assertNumQueries(5):
+            response = self.user_client.get(self.url, {'limit': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {
+            recipe['id']: recipe for recipe in response.json()['results']
+        }
+        for number, recipe in enumerate(self.recipes):
+            self.assertEqual(
+                results[recipe.pk]['is_favorited'], number % 2 == 0
+            )
+            self.assertEqual(
+                results[recipe.pk]['is_in_shopping_cart'], number % 3 == 0
+            )
+            self.assertTrue(results[recipe.pk]['author']['is_subscribed'])
+
+    def test_anonymous_retrieve(self):
+        with self.assertNumQueries(2):
+            response = self.anonymous_client.get(
+                f'{self.url}{self.recipes[0].pk}/'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_authenticated_retrieve(self):
+        with self.assertNumQueries(4):
+            response = self.user_client.get(f'{self.url}{self.recipes[0].pk}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['is_favorited'])
+        self.assertTrue(response.json()['is_in_shopping_cart'])
+
+    def test_subscriptions_preview_fields(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.user_client.get(
+                '/api/users/subscriptions/', {'recipes_limit': 2}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results'][0]['recipes']), 2)
+        recipe_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'recipes_recipe' in query['sql']
+        ]
+        self.assertTrue(recipe_queries)
+        for sql in recipe_queries:
+            self.assertNotIn('document', sql)
+            self.assertNotIn('search_vector', sql)
+
+    def test_server_timing_visibility(self):
+        url = f'{self.url}{self.recipes[0].pk}/'
+        self.assertNotIn('Server-Timing', self.anonymous_client.get(url))
+        self.assertIn(
+            'serializer;dur=', self.user_client.get(url)['Server-Timing']
+        )
+        with self.settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.anonymous_client.get(url))
+
+    def test_streaming_queries_counted(self):
+        view_name = 'RecipeViewSet.download_shopping_cart'
+        before = list(registry.get_totals().get(view_name, [0, 0]))
+        response = self.user_client.get(f'{self.url}download_shopping_cart/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.get_totals().get(view_name, [0, 0]), before)
+        with CaptureQueriesContext(connection) as context:
+            content = b''.join(response.streaming_content)
+        self.assertTrue(content)
+        self.assertTrue(context.captured_queries)
+        totals = registry.get_totals()[view_name]
+        self.assertEqual(totals[0], before[0] + 1)
+        self.assertGreaterEqual(
+            totals[1] - before[1], len(context.captured_queries)
+        )
+
+    def test_metrics_shared_between_workers(self):
+        workers = [MetricsRegistry('test', flush_interval=0) for _ in range(2)]
+        metrics = RequestMetrics()
+        metrics.queries = 3
+        metrics.db_time = 0.25
+        for worker in workers:
+            worker.observe('RecipeViewSet.list', metrics, 1.5, 100, True)
+        for worker in workers:
+            self.assertEqual(
+                worker.get_totals()['RecipeViewSet.list'],
+                [2, 6, 0.5, 0, 0, 3, 200, 0]
+            )
+
+    def test_modified_since_after_favorite(self):
+        recipe = self.recipes[1]
+        url = f'{self.url}{recipe.pk}/'
+        response = self.anonymous_client.get(url)
+        self.assertIn('Last-Modified', response)
+        response = self.user_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertFalse(response.json()['is_favorited'])
+        self.user_client.post(f'{url}favorite/')
+        response = self.user_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date()
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['is_favorited'])
+        response = self.anonymous_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=http_date()
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_not_modified(self):
+        url = f'{self.url}{self.recipes[0].pk}/'
+        etag = self.user_client.get(url)['ETag']
+        with self.assertNumQueries(2):
+            response = self.user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ResponseCacheTest(RecipeTestCase):
+    url = '/api/recipes/'
+
+    def test_cached_response_is_throttled(self):
+        with patch.object(AnonRateThrottle, 'rate', '2/day', create=True):
+            for _ in range(2):
+                response = self.anonymous_client.get(self.url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            with self.assertNumQueries(0):
+                response = self.anonymous_client.get(self.url)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+
+class RecipeUpdateTest(RecipeTestCase):
+
+    def test_patch_replaces_ingredients(self):
+        recipe = self.recipes[4]
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f'/api/recipes/{recipe.pk}/', {
+                'tags': [self.tags[0].pk],
+                'ingredients': [
+                    {'id': self.ingredients[0].pk, 'amount': 50},
+                    {'id': self.ingredients[1].pk, 'amount': 100},
+                ]
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (ingredient['id'], ingredient['amount'])
+                for ingredient in response.json()['ingredients']
+            ],
+            [(self.ingredients[0].pk, 50), (self.ingredients[1].pk, 100)]
+        )
+        self.assertEqual(
+            RecipeIngredient.objects.filter(recipe=recipe).count(), 2
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.document['ingredients'], response.json()['ingredients']
+        )
+
+
+class RecipeMatchTest(RecipeTestCase):
+    url = '/api/recipes/match/'
+
+    def setUp(self):
+        super().setUp()
+        recipe_ingredient_index._state = None
+
+    def test_match_requires_ingredients(self):
+        response = self.anonymous_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ingredients', response.json())
+
+    def test_match_ignores_cursor_pagination(self):
+        for params in ({'cursor': ''}, {'cursor': 'abc'}):
+            with self.subTest(params=params):
+                response = self.anonymous_client.get(self.url, {
+                    'ingredients': [self.ingredients[0].pk], **params
+                })
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.json()['count'], 2)
+
+    def test_match_query_count(self):
+        params = {
+            'ingredients': [
+                ingredient.pk for ingredient in self.ingredients[:2]
+            ],
+            'max_missing': 1,
+        }
+        with self.assertNumQueries(4):
+            response = self.user_client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 6)
+        with self.assertNumQueries(3):
+            self.user_client.get(self.url, params)
+
+
+class RecipeSearchTest(RecipeTestCase):
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Recipe.objects.filter(pk=cls.recipes[2].pk).update(text='Борщ')
+        Recipe.objects.filter(pk=cls.recipes[7].pk).update(name='Борщ')
+        update_search_index(recipe.pk for recipe in cls.recipes)
+
+    def test_search_ranks_name_matches_first(self):
+        with self.assertNumQueries(3):
+            response = self.anonymous_client.get(self.url, {'search': 'борщи'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.recipes[7].pk, self.recipes[2].pk]
+        )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_PROCESSING_WORKERS=2)
+class ImageRenditionsTest(RecipeTestCase):
+
+    def test_command_keeps_connection_open(self):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(buffer, 'PNG')
+        name = default_storage.save(
+            'recipes/image.png', ContentFile(buffer.getvalue())
+        )
+        Recipe.objects.update(image=name)
+        with patch.object(connection, 'close') as close:
+            call_command('build_image_renditions', stdout=StringIO())
+        close.assert_not_called()
+        self.assertTrue(all(
+            recipe.image_renditions.get('source') == name
+            for recipe in Recipe.objects.all()
+        ))
+
+    def test_strips_exif_from_original(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x8825] = {1: 'N', 2: (55.0, 45.0, 0.0)}
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(buffer, 'JPEG', exif=exif)
+        name = default_storage.save(
+            'recipes/photo.jpg', ContentFile(buffer.getvalue())
+        )
+        recipe = self.recipes[0]
+        Recipe.objects.filter(pk=recipe.pk).update(image=name)
+        process_renditions(Recipe, recipe.pk, 'image', 'image_renditions')
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image.name, name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(recipe.image_renditions['source'], recipe.image.name)
+        with default_storage.open(recipe.image.name) as file:
+            with Image.open(file) as stripped:
+                self.assertFalse(stripped.getexif())
+                self.assertEqual(stripped.size, (20, 40))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_PROCESSING_WORKERS=0)
+class RecipeImportTest(RecipeTestCase):
+    url = '/api/recipes/import/'
+
+    def setUp(self):
+        super().setUp()
+        recipe_ingredient_index._state = None
+        self.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', first_name='Админ',
+            last_name='Сайта', password='password', is_staff=True
+        )
+        self.staff_client = APIClient()
+        self.staff_client.force_authenticate(self.staff)
+
+    def get_file(self, *rows):
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), 'green').save(buffer, 'PNG')
+        image = 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
+        return SimpleUploadedFile('recipes.ndjson', '\n'.join(
+            row if isinstance(row, str) else json.dumps({
+                'tags': [self.tags[0].pk],
+                'ingredients': [{'id': self.ingredients[4].pk, 'amount': 5}],
+                'image': image, 'text': 'Описание', 'cooking_time': 5,
+                **row
+            }) for row in rows
+        ).encode(), 'application/x-ndjson')
+
+    def test_import_requires_staff(self):
+        response = self.user_client.post(
+            self.url, {'file': self.get_file({'name': 'Щи'})}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_limits_rows(self):
+        with patch('api.views.RECIPE_IMPORT_MAX_ROWS', 1):
+            response = self.staff_client.post(self.url, {
+                'file': self.get_file({'name': 'Щи'}, {'name': 'Борщ'})
+            })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(author=self.staff).exists())
+
+    def test_import_runs_side_effects(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.staff_client.post(self.url, {'file': self.get_file(
+                {'name': 'Щи'}, {'name': 'Борщ', 'cooking_time': 0},
+                'не json', {'name': 'Уха'}
+            )})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(
+            [error['line'] for error in response.json()['errors']], [2, 3]
+        )
+        self.staff.refresh_from_db()
+        self.assertEqual(self.staff.recipes_count, 2)
+        recipes = Recipe.objects.filter(author=self.staff)
+        self.assertTrue(all(
+            recipe.document and recipe.image_renditions for recipe in recipes
+        ))
+        response = self.anonymous_client.get(
+            '/api/recipes/', {'search': 'уха'}
+        )
+        self.assertEqual(response.json()['count'], 1)
+        response = self.anonymous_client.get('/api/recipes/match/', {
+            'ingredients': [self.ingredients[4].pk]
+        })
+        self.assertEqual(response.json()['count'], 2)
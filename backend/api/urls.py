@@ -2,7 +2,8 @@ from django.urls import include, path
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
 
-from api.views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from api.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
+                       UserViewSet, metrics)
 
 router = DefaultRouter()
 router.register('recipes', RecipeViewSet, basename='recipe')
@@ -17,5 +18,6 @@ urlpatterns = [
         name='docs'
     ),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/', metrics, name='metrics'),
     path('', include(router.urls))
 ]
@@ -1,21 +1,78 @@
+import csv
+import hashlib
+import json
+
 from django.db.models import Sum
+from django.utils.http import quote_etag
 
 from recipes.models import RecipeIngredient
 
 
-def get_ingredients_string_from_user_cart(user):
-    ingredients = RecipeIngredient.objects.filter(
+class EchoBuffer:
+
+    def write(self, value):
+        return value
+
+
+def get_validators(rows, *extra):
+    etag = quote_etag(
+        hashlib.md5(repr((extra, rows)).encode()).hexdigest()
+    )
+    last_modified = max((row['updated_at'] for row in rows), default=None)
+    return etag, last_modified and int(last_modified.timestamp())
+
+
+def get_user_cart_ingredients(user):
+    return RecipeIngredient.objects.filter(
         recipe__recipes_in_cart__user=user
     ).values(
         'ingredient__name',
         'ingredient__measurement_unit'
-    ).annotate(total_amount=Sum('amount'))
-    result_string = ''
+    ).annotate(
+        total_amount=Sum('amount')
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def stream_ingredients_txt(ingredients):
     for ingredient in ingredients:
-        ingredient_dict = (
+        yield (
             f'{ingredient["ingredient__name"]}'
             f' - {ingredient["total_amount"]}'
             f' {ingredient["ingredient__measurement_unit"]}.\n'
         )
-        result_string += ingredient_dict
-    return result_string
+
+
+def stream_ingredients_csv(ingredients):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['total_amount'],
+            ingredient['ingredient__measurement_unit']
+        ))
+
+
+def stream_ingredients_json(ingredients):
+    separator = '['
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['total_amount'],
+            'measurement_unit': ingredient['ingredient__measurement_unit']
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+CART_STREAMS = {
+    'txt': stream_ingredients_txt,
+    'csv': stream_ingredients_csv,
+    'json': stream_ingredients_json,
+}
+
+
+def stream_user_cart(user, file_format):
+    return CART_STREAMS[file_format](
+        get_user_cart_ingredients(user).iterator()
+    )
@@ -1,50 +1,92 @@
-import urllib.parse
+import zipfile
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from djoser.views import UserViewSet as BaseUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from api.abstracts import (AsyncReadViewSetMixin, CatalogueViewSetMixin,
+                           CursorPaginationMixin, ResponseCacheViewSetMixin,
+                           SerializerMetricsMixin)
+from api.bulk import RecipeImporter, stream_recipe_export
+from api.caches import (ingredient_responses, recipe_responses, tag_responses,
+                        user_responses)
+from api.catalogues import ingredient_catalogue, tag_catalogue
+from api.documents import save_recipe_document
 from api.filters import IngredientSearchFilter, RecipeFilterSet
+from api.matching import recipe_ingredient_index
+from api.metrics import record_serializer, registry
+from api.paginations import RecipeCursorPagination, UserCursorPagination
+from api.parsers import NdjsonParser, RawImageParser
 from api.permissions import IsAuthorOrAdminOrReadOnly
+from api.renderers import CsvCartRenderer, JsonCartRenderer, TxtCartRenderer
 from api.serializers import (AvatarSerializer, CartSerializer,
                              CreateRecipeSerializer, CreateUserSerializer,
                              FavouriteSerializer, IngredientSerializer,
-                             ReadRecipeSerializer, RecipeShortSerializer,
+                             ReadRecipeSerializer, RecipeImageSerializer,
+                             RecipeMatchParamsSerializer,
+                             RecipeMatchSerializer, RecipeShortSerializer,
                              SubscribeSerializer, TagSerializer,
                              UserSerializer, UserSubscribeSerializer)
-from api.utils import get_ingredients_string_from_user_cart
+from api.utils import get_validators, stream_user_cart
+from foodgram.constants import (RECIPE_IMPORT_MAX_ROWS,
+                                RECIPE_IMPORT_MAX_UPLOAD_SIZE)
 from recipes.models import Cart, Favourite, Ingredient, Recipe, Tag
 from users.models import Subscribe
 
 User = get_user_model()
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ResponseCacheViewSetMixin, AsyncReadViewSetMixin,
+                        SerializerMetricsMixin, CatalogueViewSetMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     permission_classes = (AllowAny, )
     pagination_class = None
     serializer_class = IngredientSerializer
     filter_backends = (IngredientSearchFilter, )
-    search_fields = ('^name', 'name')
+    catalogue = ingredient_catalogue
+    response_cache = ingredient_responses
+
+    def is_catalogue_request(self, request):
+        return not request.query_params.get(
+            IngredientSearchFilter.search_param
+        )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ResponseCacheViewSetMixin, AsyncReadViewSetMixin,
+                 SerializerMetricsMixin, CatalogueViewSetMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     permission_classes = (AllowAny, )
     pagination_class = None
     serializer_class = TagSerializer
+    catalogue = tag_catalogue
+    response_cache = tag_responses
 
 
-class UserViewSet(BaseUserViewSet):
+class UserViewSet(ResponseCacheViewSetMixin, SerializerMetricsMixin,
+                  CursorPaginationMixin, BaseUserViewSet):
     permission_classes = (IsAuthorOrAdminOrReadOnly, )
+    response_cache = user_responses
+    cursor_pagination_class = UserCursorPagination
+    raw_upload_field = 'avatar'
     http_method_names = ['get', 'post', 'put', 'delete']
 
     def get_queryset(self):
@@ -72,10 +114,8 @@ class UserViewSet(BaseUserViewSet):
 
     @action(methods=['get'], detail=False, url_path='subscriptions')
     def subscriptions(self, request):
-        queryset = self.get_queryset().filter(
-            subscribes__user=request.user
-        ).annotate(
-            recipes_count=Count('recipes')
+        queryset = self._with_recipes_preview(
+            self.get_queryset().filter(subscribes__user=request.user)
         )
         self.get_queryset = lambda: queryset
         self.get_serializer_class = lambda: UserSubscribeSerializer
@@ -109,7 +149,13 @@ class UserViewSet(BaseUserViewSet):
         )
         return Response(status=status_code)
 
-    @action(methods=['put'], detail=False, url_path='me/avatar')
+    @action(
+        methods=['put'],
+        detail=False,
+        parser_classes=(JSONParser, MultiPartParser, FormParser,
+                        RawImageParser),
+        url_path='me/avatar'
+    )
     def avatar(self, request):
         self.get_object = lambda: self.request.user
         self.get_serializer_class = lambda: AvatarSerializer
@@ -122,31 +168,135 @@ class UserViewSet(BaseUserViewSet):
 
     def _get_subscribe_target_user(self, pk):
         return get_object_or_404(
-            User.objects.annotate(
-                recipes_count=Count('recipes')
-            ),
+            self._with_recipes_preview(User.objects.all()),
             pk=pk
         )
 
+    def _with_recipes_preview(self, queryset):
+        recipes = Recipe.objects.only(
+            'author', *RecipeShortSerializer.Meta.fields
+        )
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isnumeric():
+            recipes = recipes[:int(recipes_limit)]
+        return queryset.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='recipes_preview')
+        )
+
     def _get_current_user_object(self, id):
         return User.objects.get(id=id)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.prefetch_related(
-        'tags', 'ingredients'
-    ).select_related('author')
+class RecipeViewSet(ResponseCacheViewSetMixin, AsyncReadViewSetMixin,
+                    SerializerMetricsMixin, CursorPaginationMixin,
+                    viewsets.ModelViewSet):
+    queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly, )
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilterSet
     search_fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
     http_method_names = ['get', 'post', 'patch', 'delete']
+    lookup_value_regex = r'\d+'
+    parser_classes = (JSONParser, MultiPartParser, FormParser, RawImageParser)
+    raw_upload_field = 'image'
+    cursor_pagination_class = RecipeCursorPagination
+    response_cache = recipe_responses
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector').with_user_flags(
+            self.request.user
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(self._get_validator_rows(queryset))
+        django_paginator = getattr(self.paginator.page, 'paginator', None)
+
+        def get_response():
+            recipes = queryset.in_bulk([row['id'] for row in page])
+            return self.get_paginated_response(self.get_serializer(
+                [recipes[row['id']] for row in page if row['id'] in recipes],
+                many=True
+            ).data)
+
+        return self._conditional_response(
+            request, page, get_response,
+            django_paginator and django_paginator.count
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        rows = self._get_validator_rows(
+            self.filter_queryset(self.get_queryset()).filter(pk=kwargs['pk'])
+        )
+        return self._conditional_response(
+            request, list(rows), lambda: super(RecipeViewSet, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(
+            self.get_queryset()
+        )
+        page = await self.paginator.apaginate_queryset(
+            self._get_validator_rows(queryset), request, view=self
+        )
+        django_paginator = getattr(self.paginator.page, 'paginator', None)
+
+        async def get_response():
+            recipes = {
+                recipe.pk: recipe async for recipe in queryset.filter(
+                    pk__in=[row['id'] for row in page]
+                )
+            }
+            return self.get_paginated_response(
+                await self._aget_serializer_data([
+                    recipes[row['id']] for row in page if row['id'] in recipes
+                ])
+            )
+
+        return await self._aconditional_response(
+            request, page, get_response,
+            django_paginator and django_paginator.count
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(
+            self.get_queryset()
+        )
+        queryset = queryset.filter(pk=kwargs['pk'])
+        rows = [row async for row in self._get_validator_rows(queryset)]
+
+        async def get_response():
+            recipe = await aget_object_or_404(queryset)
+            self.check_object_permissions(request, recipe)
+            return Response(await self._aget_serializer_data(recipe))
+
+        return await self._aconditional_response(request, rows, get_response)
 
     def get_serializer_class(self):
-        if self.action == 'create':
+        if self.action == 'partial_update' and self._is_raw_upload():
+            return RecipeImageSerializer
+        if self.action in ('create', 'partial_update'):
             return CreateRecipeSerializer
         return ReadRecipeSerializer
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            save_recipe_document(serializer.instance)
+            recipe_ingredient_index.schedule_update(
+                (serializer.instance.pk, )
+            )
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+            save_recipe_document(serializer.instance)
+            recipe_ingredient_index.schedule_update(
+                (serializer.instance.pk, )
+            )
+
     @action(methods=['get'], detail=True, url_path='get-link')
     def get_link(self, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
@@ -157,19 +307,103 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         detail=False,
         permission_classes=[IsAuthenticated],
+        renderer_classes=[TxtCartRenderer, CsvCartRenderer, JsonCartRenderer],
         url_path='download_shopping_cart'
     )
     def download_shopping_cart(self, request):
-        ingredients_string = get_ingredients_string_from_user_cart(
-            request.user
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            stream_user_cart(request.user, renderer.format),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename=Ingredient list.{renderer.format}'
+        )
+        return response
+
+    @action(
+        methods=['get'],
+        detail=False,
+        cursor_pagination_class=None,
+        url_path='match'
+    )
+    def match(self, request):
+        params = RecipeMatchParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ingredient_ids = set(params.validated_data['ingredients'])
+        page = self.paginate_queryset(recipe_ingredient_index.match(
+            ingredient_ids, params.validated_data['max_missing']
+        ))
+        recipes = self.get_queryset().in_bulk(page)
+        serializer = record_serializer(RecipeMatchSerializer(
+            [recipes[pk] for pk in page if pk in recipes],
+            many=True,
+            context={
+                **self.get_serializer_context(),
+                'ingredient_ids': ingredient_ids
+            }
+        ))
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['post'],
+        detail=False,
+        permission_classes=[IsAdminUser],
+        parser_classes=(MultiPartParser, NdjsonParser),
+        url_path='import'
+    )
+    def import_recipes(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['Нет файла.']})
+        images = request.FILES.get('images')
+        if (
+            upload.size + (images.size if images else 0)
+            > RECIPE_IMPORT_MAX_UPLOAD_SIZE
+            or sum(1 for line in upload if line.strip())
+            > RECIPE_IMPORT_MAX_ROWS
+        ):
+            raise ValidationError({'file': [
+                f'Через API можно загрузить не больше '
+                f'{RECIPE_IMPORT_MAX_ROWS} рецептов и '
+                f'{RECIPE_IMPORT_MAX_UPLOAD_SIZE // 1024 // 1024} МБ. '
+                f'Большие каталоги загружайте командой import_recipes.'
+            ]})
+        upload.seek(0)
+        try:
+            archive = zipfile.ZipFile(images) if images else None
+        except zipfile.BadZipFile:
+            raise ValidationError(
+                {'images': ['Файл не является zip архивом.']}
+            )
+        try:
+            report = RecipeImporter(request.user, archive).run(upload)
+        finally:
+            if archive is not None:
+                archive.close()
+        return Response(
+            report,
+            status=(
+                status.HTTP_201_CREATED if report['created']
+                else status.HTTP_400_BAD_REQUEST
+            )
         )
-        content_type = 'text/plain'
-        file_name = 'Ingredient%20list.txt'
-        file_name = urllib.parse.unquote(file_name)
-        response = HttpResponse(ingredients_string, content_type=content_type)
-        response["Content-Disposition"] = (
-            'attachment; filename=Ingredient list.txt'
+
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='export'
+    )
+    def export_recipes(self, request):
+        response = StreamingHttpResponse(
+            stream_recipe_export(
+                self.filter_queryset(self.get_queryset()),
+                request.build_absolute_uri
+            ),
+            content_type='application/x-ndjson; charset=utf-8'
         )
+        response['Content-Disposition'] = 'attachment; filename=recipes.ndjson'
         return response
 
     @action(methods=['post'], detail=True, url_path='shopping_cart')
@@ -196,8 +430,77 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request.user
         )
 
+    def _is_raw_upload(self):
+        return self.request.content_type.startswith('image/')
+
+    def _get_validator_rows(self, queryset):
+        user = self.request.user
+        return queryset.annotate(
+            is_author_subscribed=(
+                Value(False) if user.is_anonymous
+                else Exists(Subscribe.objects.filter(
+                    user=user, subscribe_to=OuterRef('author')
+                ))
+            )
+        ).values(
+            'id', 'pub_date', 'updated_at', 'is_favorited',
+            'is_in_shopping_cart', 'is_author_subscribed'
+        )
+
+    def _conditional_response(self, request, rows, get_response, *extra):
+        etag, last_modified = self._get_validators(rows, *extra)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = get_response()
+        return self._set_validators(response, etag, last_modified)
+
+    async def _aconditional_response(self, request, rows, get_response,
+                                     *extra):
+        etag, last_modified = self._get_validators(rows, *extra)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await get_response()
+        return self._set_validators(response, etag, last_modified)
+
+    def _get_validators(self, rows, *extra):
+        etag, last_modified = get_validators(rows, *extra)
+        if self.action != 'retrieve' or not self.request.user.is_anonymous:
+            return etag, None
+        return etag, last_modified
+
+    def _set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization', ))
+        return response
+
+    async def _aget_serializer_data(self, instance):
+        many = isinstance(instance, list)
+        user = self.request.user
+        context = self.get_serializer_context()
+        context['subscribed_ids'] = set() if user.is_anonymous else {
+            pk async for pk in Subscribe.objects.filter(
+                user=user
+            ).values_list('subscribe_to', flat=True)
+        }
+        serializer = record_serializer(self.get_serializer_class()(
+            instance, many=many, context=context
+        ))
+        recipes = instance if many else [instance]
+        if all(recipe.document is not None for recipe in recipes):
+            return serializer.data
+        return await sync_to_async(lambda: serializer.data)()
+
     def _add_related_item(self, recipe_pk, serializer, user):
-        recipe = get_object_or_404(Recipe, pk=recipe_pk)
+        recipe = get_object_or_404(
+            Recipe.objects.only(*RecipeShortSerializer.Meta.fields),
+            pk=recipe_pk
+        )
         data = {
             'user': user.id,
             'recipe': recipe.id
@@ -205,7 +508,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         new_related_item = serializer(data=data)
         new_related_item.is_valid(raise_exception=True)
         new_related_item.save()
-        _serializer = RecipeShortSerializer(recipe)
+        _serializer = record_serializer(RecipeShortSerializer(recipe))
         return Response(_serializer.data, status=status.HTTP_201_CREATED)
 
     def _delete_related_item(self, recipe_pk, model, user):
@@ -219,3 +522,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
             else status.HTTP_400_BAD_REQUEST
         )
         return Response(status=status_code)
+
+
+def metrics(request):
+    if not settings.DEBUG and not (
+        settings.METRICS_TOKEN and constant_time_compare(
+            request.headers.get('Authorization', ''),
+            f'Bearer {settings.METRICS_TOKEN}'
+        )
+    ):
+        raise Http404
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -6,6 +6,41 @@ USER_CHAR_MAX_LENGHT = 150
 MEASUREMENT_UNITS_INDEX = 0
 MIN_INGREDIENT_AMOUNT = 1
 PAGINATION_PAGE_SIZE = 6
+INGREDIENT_SEARCH_LIMIT = 20
+CATALOGUE_VERSION_CHECK_INTERVAL = 1
+LOCAL_CACHE_STATE_TIMEOUT = 60
+LOAD_BATCH_SIZE = 1000
+LOAD_READ_CHUNK_SIZE = 64 * 1024
+RECIPE_DOCUMENTS_CHUNK_SIZE = 500
+RECIPE_IMPORT_CHUNK_SIZE = 500
+RECIPE_IMPORT_MAX_ROWS = 1000
+RECIPE_IMPORT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+RECIPE_SEARCH_CONFIG = 'russian'
+RECIPE_SEARCH_CHUNK_SIZE = 500
+RECIPE_SEARCH_MIN_STEM_LENGTH = 3
+RECIPE_MATCH_MAX_INGREDIENTS = 100
+RECIPE_MATCH_CHANGES_LIMIT = 1000
+RECIPE_MATCH_CHANGES_TIMEOUT = 60 * 60
+IMAGE_WEBP_QUALITY = 80
+IMAGE_UPLOAD_QUALITY = 95
+SHORT_LINK_CACHE_SIZE = 100_000
+SHORT_LINK_POSITIVE_TTL = 300
+SHORT_LINK_NEGATIVE_TTL = 30
+RESPONSE_CACHE_TIMEOUT = 300
+METRICS_FLUSH_INTERVAL = 10
+BENCHMARK_USERNAME_PREFIX = 'bench_user_'
+BENCHMARK_IMAGE_PATH = 'recipes/benchmark.png'
+BENCHMARK_POPULARITY_EXPONENT = 1.1
+BENCHMARK_LARGE_CART_SIZE = 500
+BENCHMARK_REQUESTS = 200
+BENCHMARK_WARMUP_REQUESTS = 10
+BENCHMARK_CONCURRENCY = 8
+BENCHMARK_TOLERANCE = 0.2
+IMAGE_RENDITIONS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
 
 MEASUREMENT_UNITS = (
     ('gram', 'г'),
@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +72,37 @@ DATABASES = {
     }
 }
 
+if os.getenv('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.getenv('CACHE_BACKEND') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        }
+    }
+elif os.getenv('CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', BASE_DIR / 'cache'),
+        }
+    }
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -104,6 +136,33 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+
+ASYNC_VIEWS = os.getenv('DJANGO_ASYNC_VIEWS', 'false').lower() == 'true'
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+QUERY_BUDGET_RAISE = (
+    os.getenv('QUERY_BUDGET_RAISE', 'false').lower() == 'true'
+)
+
+QUERY_BUDGETS = {
+    'RecipeViewSet.list': 7,
+    'RecipeViewSet.retrieve': 4,
+    'RecipeViewSet.download_shopping_cart': 2,
+    'RecipeViewSet.match': 4,
+    'TagViewSet.list': 1,
+    'TagViewSet.retrieve': 1,
+    'IngredientViewSet.list': 2,
+    'IngredientViewSet.retrieve': 1,
+    'UserViewSet.list': 4,
+    'UserViewSet.retrieve': 3,
+    'UserViewSet.me': 2,
+    'UserViewSet.subscriptions': 5,
+    'recipe_redirect.get': 1,
+    'arecipe_redirect.get': 1,
+}
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -37,9 +37,9 @@ class RecipeAdmin(admin.ModelAdmin):
         queryset = super().get_queryset(request)
         return queryset.prefetch_related('tags', 'ingredients')
 
-    @admin.display(description='В избранных у')
+    @admin.display(description='В избранных у', ordering='favourites_count')
     def count_in_favourites(self, obj):
-        return obj.favourites_recipe.count()
+        return obj.favourites_count
 
     @admin.display(description='Теги')
     def tags_link(self, obj):
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Cart, Favourite, Recipe
+from users.models import Subscribe
+
+User = get_user_model()
+
+COUNTERS = (
+    (Favourite, Recipe, 'recipe_id', 'favourites_count'),
+    (Cart, Recipe, 'recipe_id', 'carts_count'),
+    (Recipe, User, 'author_id', 'recipes_count'),
+    (Subscribe, User, 'subscribe_to_id', 'followers_count'),
+)
+
+
+def update_counter(model, pk, field, delta):
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def recount_counters():
+    for source, target, fk_name, field in COUNTERS:
+        total = source.objects.filter(
+            **{fk_name: OuterRef('pk')}
+        ).order_by().values(fk_name).annotate(total=Count('pk'))
+        target.objects.update(
+            **{field: Coalesce(Subquery(total.values('total')), 0)}
+        )
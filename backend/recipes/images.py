@@ -0,0 +1,133 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from foodgram.constants import (IMAGE_RENDITIONS, IMAGE_UPLOAD_QUALITY,
+                                IMAGE_WEBP_QUALITY)
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEYS = {'exif', 'xmp', 'XML:com.adobe.xmp', 'comment'}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-renditions'
+        )
+    return _executor
+
+
+def has_metadata(image):
+    return bool(image.getexif()) or bool(METADATA_KEYS & image.info.keys())
+
+
+def save_stripped(name, image, image_format, icc_profile):
+    buffer = BytesIO()
+    image.save(
+        buffer, image_format,
+        quality=IMAGE_UPLOAD_QUALITY, icc_profile=icc_profile
+    )
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_renditions(name):
+    with default_storage.open(name) as file:
+        source = Image.open(file)
+        image = ImageOps.exif_transpose(source)
+        if has_metadata(source):
+            name = save_stripped(
+                name, image, source.format, source.info.get('icc_profile')
+            )
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    path = PurePosixPath(name)
+    renditions = {'source': name}
+    for rendition, size in IMAGE_RENDITIONS.items():
+        resized = image.copy()
+        resized.thumbnail(size)
+        buffer = BytesIO()
+        resized.save(buffer, 'WEBP', quality=IMAGE_WEBP_QUALITY)
+        renditions[rendition] = default_storage.save(
+            f'{path.parent}/renditions/{path.stem}_{rendition}.webp',
+            ContentFile(buffer.getvalue())
+        )
+    return renditions
+
+
+def delete_renditions(renditions):
+    for rendition in IMAGE_RENDITIONS:
+        if renditions.get(rendition):
+            default_storage.delete(renditions[rendition])
+
+
+def process_renditions(model, pk, image_field, renditions_field):
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None:
+            return
+        image = getattr(instance, image_field)
+        old_renditions = getattr(instance, renditions_field)
+        if not image or old_renditions.get('source') == image.name:
+            return
+        renditions = build_renditions(image.name)
+        stripped = renditions['source'] != image.name
+        if not model.objects.filter(pk=pk, **{image_field: image.name}):
+            delete_renditions(renditions)
+            if stripped:
+                default_storage.delete(renditions['source'])
+            return
+        delete_renditions(old_renditions)
+        update_fields = [renditions_field]
+        if stripped:
+            setattr(instance, image_field, renditions['source'])
+            update_fields.append(image_field)
+        setattr(instance, renditions_field, renditions)
+        instance.save(update_fields=update_fields + [
+            field.name for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ])
+        if stripped:
+            default_storage.delete(image.name)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение %s %s', model.__name__, pk
+        )
+
+
+def process_renditions_in_worker(*arguments):
+    try:
+        process_renditions(*arguments)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(instance, image_field, renditions_field):
+    image = getattr(instance, image_field)
+    renditions = getattr(instance, renditions_field)
+    if not image:
+        if renditions:
+            delete_renditions(renditions)
+            type(instance).objects.filter(pk=instance.pk).update(
+                **{renditions_field: {}}
+            )
+        return
+    if renditions.get('source') == image.name:
+        return
+    arguments = (type(instance), instance.pk, image_field, renditions_field)
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        transaction.on_commit(lambda: process_renditions(*arguments))
+        return
+    transaction.on_commit(lambda: get_executor().submit(
+        process_renditions_in_worker, *arguments
+    ))
@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_renditions
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные WebP-версии изображений рецептов и аватаров.'
+
+    def handle(self, *args, **options):
+        for model, image_field in ((Recipe, 'image'), (User, 'avatar')):
+            renditions_field = f'{image_field}_renditions'
+            pks = model.objects.exclude(
+                **{image_field: ''}
+            ).values_list('pk', flat=True)
+            for pk in pks.iterator():
+                process_renditions(model, pk, image_field, renditions_field)
+            self.stdout.write(
+                f'{model.__name__}: обработано {pks.count()} изображений.'
+            )
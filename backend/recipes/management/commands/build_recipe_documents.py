@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.documents import refresh_recipe_documents
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает документы рецептов для чтения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Собрать документы только для рецептов без документа.'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['missing']:
+            queryset = queryset.filter(document__isnull=True)
+        started = time.monotonic()
+        total = refresh_recipe_documents(queryset)
+        self.stdout.write(
+            f'Собрано документов: {total} '
+            f'за {time.monotonic() - started:.2f} с.'
+        )
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс рецептов.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = update_search_index(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+        )
+        self.stdout.write(
+            f'Проиндексировано рецептов: {total} '
+            f'за {time.monotonic() - started:.2f} с.'
+        )
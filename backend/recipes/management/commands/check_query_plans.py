@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import UniqueConstraint
+from django.http import QueryDict
+from django.test import RequestFactory
+
+from api.filters import IngredientSearchFilter, RecipeFilterSet
+from api.utils import get_user_cart_ingredients
+from foodgram.constants import PAGINATION_PAGE_SIZE
+from recipes.models import Cart, Favourite, Ingredient, Recipe, Tag
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+def get_unique_index_names(model, fields):
+    return tuple(
+        constraint.name for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint)
+        and tuple(constraint.fields) == fields
+    ) + (f'sqlite_autoindex_{model._meta.db_table}_', )
+
+
+def get_m2m_unique_index_names(field):
+    through = field.remote_field.through
+    columns = '_'.join(
+        through._meta.get_field(name).column
+        for name in (field.m2m_field_name(), field.m2m_reverse_field_name())
+    )
+    return (
+        f'{through._meta.db_table}_{columns}',
+        f'sqlite_autoindex_{through._meta.db_table}_',
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет через EXPLAIN, что основные запросы API используют '
+        'предназначенные для них индексы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--real-plans', action='store_true',
+            help='Не запрещать последовательное сканирование в PostgreSQL. '
+                 'На маленьких таблицах планировщик предпочтёт его индексам.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.order_by('-followers_count', 'id').first()
+        if user is None:
+            raise CommandError('Нет пользователей для построения запросов.')
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and not options['real_plans']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset, expected in self._get_queries(user):
+                plan = queryset.explain()
+                missing = [
+                    names[0] for names in expected
+                    if not any(index in plan for index in names)
+                ]
+                if missing:
+                    failures.append(name)
+                    self.stdout.write(
+                        f'{name}: не используются {", ".join(missing)}\n'
+                        f'{plan}'
+                    )
+                else:
+                    self.stdout.write(f'{name}: OK')
+                    if options['verbosity'] > 1:
+                        self.stdout.write(plan)
+        if failures:
+            raise CommandError(
+                f'Запросы без нужных индексов: {", ".join(failures)}'
+            )
+
+    def _get_queries(self, user):
+        feed_index = ('recipes_recipe_feed_idx', )
+        author_feed_index = ('recipes_recipe_author_feed_idx', )
+        favourite_index = get_unique_index_names(Favourite, ('user', 'recipe'))
+        cart_index = get_unique_index_names(Cart, ('user', 'recipe'))
+        tags_index = get_m2m_unique_index_names(Recipe._meta.get_field('tags'))
+        subscribe_index = get_unique_index_names(
+            Subscribe, ('user', 'subscribe_to')
+        )
+        followers_index = ('users_subscribe_followers_idx', )
+        cart_ingredients_index = ('recipes_cart_ingredients_idx', )
+        search_index = ('recipes_recipe_search_idx', 'recipes_recipe_fts')
+        ingredient_search_index = ('recipes_ingredient_name_trgm', )
+        search = Ingredient.objects.filter(
+            recipes__isnull=False
+        ).values_list('name', flat=True).first() or ''
+        tags = '&'.join(
+            f'tags={slug}'
+            for slug in Tag.objects.values_list('slug', flat=True)[:2]
+        )
+        return (
+            ('Лента рецептов', self._get_feed(user, ''),
+             (feed_index, favourite_index, cart_index)),
+            ('Рецепты автора', self._get_feed(user, f'author={user.pk}'),
+             (author_feed_index, )),
+            ('Рецепты по тегам', self._get_feed(user, tags),
+             (tags_index, )),
+            ('Избранное', self._get_feed(user, 'is_favorited=1'),
+             (favourite_index, )),
+            ('Корзина', self._get_feed(user, 'is_in_shopping_cart=1'),
+             (cart_index, )),
+            ('Подписки', User.objects.filter(
+                subscribes__user=user
+            ).order_by('-id')[:PAGINATION_PAGE_SIZE], (subscribe_index, )),
+            ('Подписчики', Subscribe.objects.filter(
+                subscribe_to=user
+            ).values('user'), (followers_index, )),
+            ('Список покупок', get_user_cart_ingredients(user),
+             (cart_index, cart_ingredients_index)),
+            ('Поиск рецептов', self._get_feed(user, urlencode({
+                'search': search
+            })), (search_index, )),
+            ('Поиск ингредиентов', self._get_ingredient_search(search[:3]),
+             (ingredient_search_index, )
+             if connection.vendor == 'postgresql' else ()),
+        )
+
+    def _get_ingredient_search(self, name):
+        request = RequestFactory().get('/', {
+            IngredientSearchFilter.search_param: name
+        })
+        request.query_params = request.GET
+        return IngredientSearchFilter().filter_queryset(
+            request, Ingredient.objects.all(), SimpleNamespace(action='list')
+        )
+
+    def _get_feed(self, user, query):
+        request = RequestFactory().get('/')
+        request.user = user
+        return RecipeFilterSet(
+            QueryDict(query),
+            queryset=Recipe.objects.with_user_flags(user),
+            request=request
+        ).qs.order_by('-pub_date', '-id')[:PAGINATION_PAGE_SIZE]
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.bulk import stream_recipe_export
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в NDJSON, по рецепту в строке.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='Путь к файлу. По умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        lines = stream_recipe_export(Recipe.objects.all())
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            file.writelines(lines)
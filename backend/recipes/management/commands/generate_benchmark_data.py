@@ -0,0 +1,208 @@
+import io
+import random
+import time
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from foodgram.constants import (BENCHMARK_IMAGE_PATH,
+                                BENCHMARK_LARGE_CART_SIZE,
+                                BENCHMARK_POPULARITY_EXPONENT,
+                                BENCHMARK_USERNAME_PREFIX, LOAD_BATCH_SIZE)
+from recipes.models import (Cart, Favourite, Ingredient, Recipe,
+                            RecipeIngredient, Tag)
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+def get_popularity_weights(size):
+    return list(accumulate(
+        1 / (rank + 1) ** BENCHMARK_POPULARITY_EXPONENT
+        for rank in range(size)
+    ))
+
+
+def iter_batches(items, batch_size):
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт пользователей, рецепты, избранное, корзины и подписки '
+        'для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favourites', type=int, default=20,
+            help='Среднее количество рецептов в избранном у пользователя.'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее количество рецептов в корзине у пользователя.'
+        )
+        parser.add_argument(
+            '--large-cart', type=int, default=BENCHMARK_LARGE_CART_SIZE,
+            help='Количество рецептов в корзине первого пользователя '
+                 'для проверки выгрузки списка покупок.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=5,
+            help='Среднее количество подписок у пользователя.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--data-dir', default=str(settings.BASE_DIR.parent / 'data'),
+            help='Папка с ингредиентами и тегами для load_from_csv.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=LOAD_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if User.objects.filter(
+            username__startswith=BENCHMARK_USERNAME_PREFIX
+        ).exists():
+            raise CommandError('Данные для тестирования уже созданы.')
+        started = time.monotonic()
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if not Ingredient.objects.exists() or not Tag.objects.exists():
+            call_command('load_from_csv', options['data_dir'])
+        user_ids = self._create_users(options['users'])
+        recipe_ids = self._create_recipes(user_ids, options['recipes'])
+        self._create_relations(
+            Favourite, user_ids, recipe_ids, options['favourites']
+        )
+        self._create_relations(Cart, user_ids, recipe_ids, options['carts'])
+        self._fill_large_cart(user_ids[0], recipe_ids, options['large_cart'])
+        self._create_subscriptions(user_ids, options['subscriptions'])
+        call_command('recount_counters')
+        call_command('build_recipe_documents')
+        call_command('build_search_index')
+        self.stdout.write(
+            f'Данные для тестирования созданы '
+            f'за {time.monotonic() - started:.2f} с.'
+        )
+
+    def _create_users(self, total):
+        password = make_password(None)
+        for batch in iter_batches(range(total), self.batch_size):
+            User.objects.bulk_create([
+                User(
+                    username=f'{BENCHMARK_USERNAME_PREFIX}{number}',
+                    email=f'{BENCHMARK_USERNAME_PREFIX}{number}@example.com',
+                    first_name='Пользователь',
+                    last_name=str(number),
+                    password=password
+                ) for number in batch
+            ])
+        user_ids = list(User.objects.filter(
+            username__startswith=BENCHMARK_USERNAME_PREFIX
+        ).order_by('id').values_list('id', flat=True))
+        self.stdout.write(f'Пользователей: {len(user_ids)}.')
+        return user_ids
+
+    def _create_recipes(self, user_ids, total):
+        image = self._get_image()
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        author_weights = get_popularity_weights(len(user_ids))
+        recipe_ids = []
+        for batch in iter_batches(range(total), self.batch_size):
+            authors = self.rng.choices(
+                user_ids, cum_weights=author_weights, k=len(batch)
+            )
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    name=f'Рецепт {number}',
+                    text=f'Описание рецепта {number}.',
+                    cooking_time=self.rng.randint(5, 180),
+                    author_id=author_id,
+                    image=image
+                ) for number, author_id in zip(batch, authors)
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in self.rng.sample(
+                    tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+                )
+            ])
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id,
+                    amount=self.rng.randint(1, 500)
+                )
+                for recipe in recipes
+                for ingredient_id in self.rng.sample(
+                    ingredient_ids,
+                    self.rng.randint(3, min(12, len(ingredient_ids)))
+                )
+            ])
+            recipe_ids.extend(recipe.id for recipe in recipes)
+        self.stdout.write(f'Рецептов: {len(recipe_ids)}.')
+        return recipe_ids
+
+    def _create_relations(self, model, user_ids, recipe_ids, average):
+        recipe_weights = get_popularity_weights(len(recipe_ids))
+        total = 0
+        for batch in iter_batches(user_ids, self.batch_size):
+            objects = [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in batch
+                for recipe_id in set(self.rng.choices(
+                    recipe_ids, cum_weights=recipe_weights,
+                    k=int(self.rng.expovariate(1 / average))
+                ))
+            ] if average else []
+            model.objects.bulk_create(objects)
+            total += len(objects)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}.')
+
+    def _fill_large_cart(self, user_id, recipe_ids, size):
+        objects = [
+            Cart(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in self.rng.sample(
+                recipe_ids, min(size, len(recipe_ids))
+            )
+        ]
+        Cart.objects.bulk_create(objects, ignore_conflicts=True)
+        self.stdout.write(f'Рецептов в большой корзине: {len(objects)}.')
+
+    def _create_subscriptions(self, user_ids, average):
+        author_weights = get_popularity_weights(len(user_ids))
+        total = 0
+        for batch in iter_batches(user_ids, self.batch_size):
+            objects = [
+                Subscribe(user_id=user_id, subscribe_to_id=author_id)
+                for user_id in batch
+                for author_id in set(self.rng.choices(
+                    user_ids, cum_weights=author_weights,
+                    k=int(self.rng.expovariate(1 / average))
+                )) - {user_id}
+            ] if average else []
+            Subscribe.objects.bulk_create(objects)
+            total += len(objects)
+        self.stdout.write(f'Подписок: {total}.')
+
+    def _get_image(self):
+        if not default_storage.exists(BENCHMARK_IMAGE_PATH):
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 480), (200, 160, 120)).save(buffer, 'PNG')
+            default_storage.save(
+                BENCHMARK_IMAGE_PATH, ContentFile(buffer.getvalue())
+            )
+        return BENCHMARK_IMAGE_PATH
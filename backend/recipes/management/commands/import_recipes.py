@@ -0,0 +1,67 @@
+import json
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from api.bulk import RecipeImporter
+from foodgram.constants import RECIPE_IMPORT_CHUNK_SIZE
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Импортирует рецепты из NDJSON файла, по рецепту в строке.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к NDJSON файлу.')
+        parser.add_argument(
+            '--author', required=True,
+            help='Имя пользователя или email автора рецептов.'
+        )
+        parser.add_argument(
+            '--images',
+            help='Zip архив с изображениями. Поле image в строке содержит '
+                 'путь к файлу в архиве или ссылку с таким же именем файла.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=RECIPE_IMPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(
+            Q(username=options['author']) | Q(email=options['author'])
+        ).first()
+        if author is None:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.'
+            )
+        try:
+            archive = (
+                zipfile.ZipFile(options['images'])
+                if options['images'] else None
+            )
+        except (OSError, zipfile.BadZipFile) as error:
+            raise CommandError(f'Не удалось открыть архив: {error}')
+        try:
+            with open(options['path'], encoding='utf-8') as file:
+                report = RecipeImporter(
+                    author, archive, options['chunk_size']
+                ).run(file)
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть файл: {error}')
+        finally:
+            if archive is not None:
+                archive.close()
+        for error in report['errors']:
+            self.stderr.write(
+                f'Строка {error["line"]}: '
+                f'{json.dumps(error["errors"], ensure_ascii=False)}'
+            )
+        self.stdout.write(
+            f'Создано рецептов: {report["created"]} '
+            f'за {report["seconds"]:.2f} с '
+            f'({report["recipes_per_second"]} рецептов/с). '
+            f'Ошибок: {len(report["errors"])}.'
+        )
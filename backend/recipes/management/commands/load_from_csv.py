@@ -1,65 +1,114 @@
 import csv
-import glob
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
 
+from api.caches import ingredient_responses, tag_responses
+from api.catalogues import ingredient_catalogue, tag_catalogue
+from foodgram.constants import LOAD_BATCH_SIZE, LOAD_READ_CHUNK_SIZE
 from recipes.models import Ingredient, Tag
 
-User = get_user_model()
+
+def iter_csv_rows(file, fields):
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+def iter_json_rows(file, fields):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    while True:
+        chunk = file.read(LOAD_READ_CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not opened and buffer[position:position + 1] == '[':
+                opened = True
+                position += 1
+                continue
+            if buffer[position:position + 1] in ('', ']'):
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield {field: item[field] for field in fields}
+        if not chunk:
+            return
 
 
 class Command(BaseCommand):
-    help = 'Укажите путь к папке с csv документами.'
-    model_class_dict = {
-        Ingredient.__name__.lower(): Ingredient,
-        Tag.__name__.lower(): Tag
+    help = 'Укажите путь к папке с csv или json документами.'
+    models = {
+        Ingredient: (
+            ('name', 'measurement_unit'),
+            ingredient_catalogue,
+            ingredient_responses
+        ),
+        Tag: (('name', 'slug'), tag_catalogue, tag_responses),
+    }
+    readers = {
+        '.csv': iter_csv_rows,
+        '.json': iter_json_rows,
     }
 
     def add_arguments(self, parser):
         parser.add_argument('path_to_dir', type=str)
+        parser.add_argument(
+            '--batch-size', type=int, default=LOAD_BATCH_SIZE
+        )
 
     def handle(self, *args, **options):
-        csv_list = glob.glob(f'{options["path_to_dir"]}/*.csv')
-        print(csv_list)
-        pointer = 0
-        if not csv_list:
-            raise CommandError('В директории нет .csv файлов')
-        while csv_list or pointer > len(csv_list):
-            csv_file = csv_list[pointer]
-            with open(csv_file, encoding='utf-8-sig') as file:
-                file_name = csv_file.split('/')[-1]
-                model_key = self._get_model_key_from_filename(file_name)
-                if not model_key:
-                    self.stdout.write(
-                        f'Файл {file_name} не подходит ни к одной модели.',
-                        ending='\n'
-                    )
-                    csv_list.pop(pointer)
-                    continue
-                model_class = self.model_class_dict[model_key]
-                self._write_to_database(file, model_class)
-                csv_list.pop(pointer)
+        files = sorted(
+            path for path in Path(options['path_to_dir']).iterdir()
+            if path.suffix in self.readers
+        )
+        if not files:
+            raise CommandError('В директории нет .csv или .json файлов')
+        for path in files:
+            model_class = self._get_model_from_filename(path.name)
+            if model_class is None:
+                self.stdout.write(
+                    f'Файл {path.name} не подходит ни к одной модели.'
+                )
+                continue
+            self._load_file(path, model_class, options['batch_size'])
 
-    def _get_model_key_from_filename(self, file_name):
-        for model_name in self.model_class_dict.keys():
-            if model_name in file_name:
-                return model_name
+    def _get_model_from_filename(self, file_name):
+        for model_class in self.models:
+            if model_class.__name__.lower() in file_name:
+                return model_class
         return None
 
-    def _write_to_database(self, file, model_class):
-        reader = csv.reader(file)
-        fields = []
-        kwarg = {}
-        if model_class is Ingredient:
-            fields = Ingredient._meta.get_fields()[3:5]
-        elif model_class is Tag:
-            fields = Tag._meta.get_fields()[2:4]
-        for row in reader:
-            for i in range(len(row)):
-                kwarg[fields[i].attname] = row[i]
-            _, created = model_class.objects.get_or_create(**kwarg)
-            self.stdout.write(
-                f'Создан экземппляр модели {model_class.__name__}',
-                ending='\n'
-            )
+    def _load_file(self, path, model_class, batch_size):
+        fields, catalogue, responses = self.models[model_class]
+        started = time.monotonic()
+        count_before = model_class.objects.count()
+        total = 0
+        with open(path, encoding='utf-8-sig') as file:
+            rows = self.readers[path.suffix](file, fields)
+            while batch := list(islice(rows, batch_size)):
+                model_class.objects.bulk_create(
+                    [model_class(**row) for row in batch],
+                    ignore_conflicts=True
+                )
+                total += len(batch)
+        created = model_class.objects.count() - count_before
+        elapsed = time.monotonic() - started
+        catalogue.invalidate()
+        responses.invalidate()
+        self.stdout.write(
+            f'{path.name}: прочитано {total}, создано {created} '
+            f'объектов {model_class.__name__} за {elapsed:.2f} с '
+            f'({total / max(elapsed, 1e-6):.0f} строк/с).'
+        )
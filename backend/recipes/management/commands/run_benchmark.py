@@ -0,0 +1,322 @@
+import http.client
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from foodgram.constants import (BENCHMARK_CONCURRENCY, BENCHMARK_REQUESTS,
+                                BENCHMARK_TOLERANCE, BENCHMARK_USERNAME_PREFIX,
+                                BENCHMARK_WARMUP_REQUESTS)
+from recipes.models import Cart, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class ClientTransport:
+    concurrency = 1
+
+    def __init__(self):
+        self.client = Client(
+            HTTP_HOST=settings.ALLOWED_HOSTS[0].lstrip('.'),
+            raise_request_exception=False
+        )
+
+    def get(self, path, headers):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.client.get(path, headers=headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, counter.queries
+
+
+class HttpTransport:
+
+    def __init__(self, base_url, concurrency):
+        url = urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip('/')
+        self.concurrency = concurrency
+        self.local = threading.local()
+
+    def get(self, path, headers):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = self.connection_class(self.netloc)
+        try:
+            self.local.connection.request(
+                'GET', self.prefix + path, headers=headers
+            )
+            response = self.local.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.local.connection.close()
+            self.local.connection = None
+            return None, None
+        match = QUERIES_PATTERN.search(
+            response.getheader('Server-Timing', '')
+        )
+        return response.status, match and int(match.group(1))
+
+
+def format_queries(queries):
+    return '—' if queries is None else f'{queries:.1f}'
+
+
+def get_percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0
+    return statistics.quantiles(
+        values, n=100, method='inclusive'
+    )[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает основные эндпоинты API и сравнивает пропускную '
+        'способность, задержки и количество запросов к БД с эталоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='Адрес запущенного сервера. Без него запросы выполняются '
+                 'в текущем процессе через тестовый клиент Django.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=BENCHMARK_REQUESTS
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=BENCHMARK_WARMUP_REQUESTS
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=BENCHMARK_CONCURRENCY,
+            help='Количество параллельных клиентов при --base-url.'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только указанный сценарий.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save-baseline', help='Сохранить результат.')
+        parser.add_argument('--baseline', help='Сравнить с результатом.')
+        parser.add_argument(
+            '--tolerance', type=float, default=BENCHMARK_TOLERANCE,
+            help='Допустимое ухудшение p99 и пропускной способности.'
+        )
+
+    def handle(self, *args, **options):
+        transport = (
+            HttpTransport(options['base_url'], options['concurrency'])
+            if options['base_url'] else ClientTransport()
+        )
+        scenarios = self._get_scenarios(random.Random(options['seed']))
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные сценарии: {", ".join(sorted(unknown))}'
+                )
+            scenarios = {
+                name: scenarios[name] for name in options['scenarios']
+            }
+        results = {
+            'meta': {
+                'database': connection.vendor,
+                'base_url': options['base_url'],
+                'concurrency': transport.concurrency,
+                'recipes': Recipe.objects.count(),
+                'users': User.objects.count(),
+            },
+            'scenarios': {},
+        }
+        self.stdout.write(
+            f'{"сценарий":24} {"запросов":>8} {"ошибок":>6} {"rps":>8} '
+            f'{"p50, мс":>8} {"p90, мс":>8} {"p99, мс":>8} {"SQL":>6}'
+        )
+        for name, (paths, headers) in scenarios.items():
+            result = self._run_scenario(
+                transport, paths, headers,
+                options['requests'], options['warmup']
+            )
+            results['scenarios'][name] = result
+            self.stdout.write(
+                f'{name:24} {result["requests"]:8} {result["errors"]:6} '
+                f'{result["rps"]:8.1f} {result["p50"]:8.2f} '
+                f'{result["p90"]:8.2f} {result["p99"]:8.2f} '
+                f'{format_queries(result["queries"]):>6}'
+            )
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['tolerance'])
+
+    def _get_scenarios(self, rng):
+        user = self._get_benchmark_user()
+        token, _ = Token.objects.get_or_create(user=user)
+        auth = {'Authorization': f'Token {token.key}'}
+        recipe_ids = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)[:1000]
+        )
+        if not recipe_ids:
+            raise CommandError(
+                'Нет рецептов. Сначала выполните generate_benchmark_data.'
+            )
+        author_ids = list(User.objects.filter(
+            recipes_count__gt=0
+        ).order_by('-recipes_count').values_list('id', flat=True)[:50])
+        tags = list(Tag.objects.values_list('slug', flat=True))
+        names = list(Ingredient.objects.values_list('name', flat=True)[:500])
+        prefixes = sorted({name[:3] for name in names if len(name) >= 3})
+        recipes = [f'/api/recipes/{pk}/' for pk in rng.sample(
+            recipe_ids, min(100, len(recipe_ids))
+        )]
+        return {
+            'recipes_feed': (['/api/recipes/'], {}),
+            'recipes_feed_auth': (['/api/recipes/'], auth),
+            'recipes_by_tags': ([
+                '/api/recipes/?' + '&'.join(
+                    f'tags={slug}' for slug in rng.sample(
+                        tags, min(2, len(tags))
+                    )
+                ) for _ in range(10)
+            ], auth),
+            'recipes_by_author': ([
+                f'/api/recipes/?author={pk}' for pk in author_ids
+            ], auth),
+            'recipes_favorited': (['/api/recipes/?is_favorited=1'], auth),
+            'recipes_in_cart': (['/api/recipes/?is_in_shopping_cart=1'], auth),
+            'recipe_detail': (recipes, auth),
+            'subscriptions': (
+                ['/api/users/subscriptions/?recipes_limit=3'], auth
+            ),
+            'download_shopping_cart': (
+                ['/api/recipes/download_shopping_cart/'], auth
+            ),
+            'download_shopping_cart_csv': (
+                ['/api/recipes/download_shopping_cart/?format=csv'], auth
+            ),
+            'download_shopping_cart_json': (
+                ['/api/recipes/download_shopping_cart/?format=json'], auth
+            ),
+            'ingredient_search': ([
+                '/api/ingredients/?' + urlencode({'name': prefix})
+                for prefix in prefixes
+            ], {}),
+            'short_link': ([
+                f'/s/{pk:x}' for pk in rng.sample(
+                    recipe_ids, min(100, len(recipe_ids))
+                )
+            ], {}),
+        }
+
+    def _get_benchmark_user(self):
+        users = User.objects.filter(
+            username__startswith=BENCHMARK_USERNAME_PREFIX
+        )
+        busiest = Cart.objects.filter(user__in=users).values(
+            'user'
+        ).annotate(total=Count('id')).order_by('-total', 'user').first()
+        if busiest is None:
+            raise CommandError(
+                'Нет данных для тестирования. '
+                'Сначала выполните generate_benchmark_data.'
+            )
+        return User.objects.get(pk=busiest['user'])
+
+    def _run_scenario(self, transport, paths, headers, requests, warmup):
+        for number in range(warmup):
+            transport.get(paths[number % len(paths)], headers)
+
+        def send(number):
+            started = time.perf_counter()
+            status, queries = transport.get(
+                paths[number % len(paths)], headers
+            )
+            return (
+                time.perf_counter() - started,
+                status is None or status >= 400,
+                queries
+            )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(transport.concurrency) as executor:
+            samples = list(executor.map(send, range(requests)))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(sample[0] * 1000 for sample in samples)
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+        return {
+            'requests': requests,
+            'errors': sum(sample[1] for sample in samples),
+            'rps': requests / elapsed,
+            'p50': get_percentile(latencies, 50),
+            'p90': get_percentile(latencies, 90),
+            'p99': get_percentile(latencies, 99),
+            'queries': statistics.fmean(queries) if queries else None,
+        }
+
+    def _compare(self, results, path, tolerance):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = []
+        self.stdout.write(
+            f'\nСравнение с {path} '
+            f'({baseline["meta"]["database"]}, '
+            f'параллельность {baseline["meta"]["concurrency"]}):'
+        )
+        for name, result in results['scenarios'].items():
+            base = baseline['scenarios'].get(name)
+            if base is None:
+                continue
+            problems = []
+            if result['p99'] > base['p99'] * (1 + tolerance):
+                problems.append('p99')
+            if result['rps'] < base['rps'] * (1 - tolerance):
+                problems.append('rps')
+            if None not in (result['queries'], base['queries']) and (
+                round(result['queries'], 1) > round(base['queries'], 1)
+            ):
+                problems.append('SQL')
+            if result['errors'] > base['errors']:
+                problems.append('ошибки')
+            self.stdout.write(
+                f'{name:24} rps {base["rps"]:8.1f} -> {result["rps"]:8.1f}  '
+                f'p99 {base["p99"]:8.2f} -> {result["p99"]:8.2f}  '
+                f'SQL {format_queries(base["queries"]):>5} -> '
+                f'{format_queries(result["queries"]):>5}'
+                + (f'  РЕГРЕССИЯ: {", ".join(problems)}' if problems else '')
+            )
+            if problems:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f'Регрессии в сценариях: {", ".join(regressions)}'
+            )
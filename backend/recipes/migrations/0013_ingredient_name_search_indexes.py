@@ -0,0 +1,43 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+SEARCH_INDEXES = (
+    GinIndex(
+        OpClass(Upper('name'), name='gin_trgm_ops'),
+        name='recipes_ingredient_name_trgm'
+    ),
+    models.Index(
+        OpClass(Upper('name'), name='text_pattern_ops'),
+        name='recipes_ingredient_name_prefix'
+    ),
+)
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    ingredient = apps.get_model('recipes', 'Ingredient')
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(ingredient, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    ingredient = apps.get_model('recipes', 'Ingredient')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(ingredient, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_alter_recipeingredient_recipe'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+def copy_pub_date(apps, schema_editor):
+    recipe = apps.get_model('recipes', 'Recipe')
+    recipe.objects.update(updated_at=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
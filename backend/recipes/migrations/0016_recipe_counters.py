@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:09
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Favourite', 'recipes', 'Recipe', 'recipe', 'favourites_count'),
+    ('recipes', 'Cart', 'recipes', 'Recipe', 'recipe', 'carts_count'),
+    ('recipes', 'Recipe', 'users', 'User', 'author', 'recipes_count'),
+    ('users', 'Subscribe', 'users', 'User', 'subscribe_to', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for source_app, source, target_app, target, fk_name, field in COUNTERS:
+        total = apps.get_model(source_app, source).objects.filter(
+            **{fk_name: models.OuterRef('pk')}
+        ).order_by().values(fk_name).annotate(total=models.Count('pk'))
+        apps.get_model(target_app, target).objects.update(
+            **{field: Coalesce(models.Subquery(total.values('total')), 0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_feed_index'),
+        ('users', '0007_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах у'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favourites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранных у'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='document',
+            field=models.JSONField(editable=False, null=True, verbose_name='Документ для чтения'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+TRIGRAM_INDEX = GinIndex(
+    OpClass(Upper('name'), name='gin_trgm_ops'),
+    name='recipes_ingredient_name_trgm'
+)
+PREFIX_INDEX = models.Index(
+    OpClass(Upper('name'), name='text_pattern_ops'),
+    name='recipes_ingredient_name_prefix'
+)
+
+
+def remove_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(
+        apps.get_model('recipes', 'Ingredient'), PREFIX_INDEX
+    )
+
+
+def add_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(
+        apps.get_model('recipes', 'Ingredient'), PREFIX_INDEX
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0020_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(remove_prefix_index, add_prefix_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=TRIGRAM_INDEX,
+                ),
+            ],
+        ),
+    ]
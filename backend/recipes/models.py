@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Upper
 from django.urls import reverse
 
 from foodgram.constants import (MEASUREMENT_UNITS, MEASUREMENT_UNITS_INDEX,
@@ -41,10 +44,39 @@ class Ingredient(ModelWithName):
                 name='%(app_label)s_%(class)s_prevent_not_unique_name_and_unit'
             ),
         )
+        indexes = (
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='%(app_label)s_%(class)s_name_trgm'
+            ),
+        )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False)
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favourite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                Cart.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            )
+        )
 
 
 class Recipe(ModelWithName):
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -60,17 +92,44 @@ class Recipe(ModelWithName):
         verbose_name='Игредиенты'
     )
     image = models.ImageField('Изображение', null=False, upload_to='recipes/')
+    image_renditions = models.JSONField(
+        'Версии изображения', default=dict, editable=False
+    )
     text = models.TextField('Текст')
     cooking_time = models.PositiveIntegerField(
         'Время приготовления',
         validators=[MinValueValidator(MIN_RECIPE_COOKING_TIME_VALUE), ]
     )
+    favourites_count = models.PositiveIntegerField(
+        'В избранных у', default=0, editable=False
+    )
+    carts_count = models.PositiveIntegerField(
+        'В корзинах у', default=0, editable=False
+    )
+    document = models.JSONField(
+        'Документ для чтения', null=True, editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор', null=True, editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
         ordering = ('-pub_date', )
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='%(app_label)s_%(class)s_feed_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='%(app_label)s_%(class)s_author_feed_idx'
+            ),
+        )
 
     @property
     def get_short_url(self):
@@ -129,6 +188,12 @@ class RecipeIngredient(models.Model):
                 )
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'ingredient', 'amount'),
+                name='%(app_label)s_cart_ingredients_idx'
+            ),
+        )
 
     def __str__(self):
         return (
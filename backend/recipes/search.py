@@ -0,0 +1,148 @@
+import re
+from collections import defaultdict
+
+from asgiref.local import Local
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+
+from foodgram.constants import (RECIPE_SEARCH_CHUNK_SIZE, RECIPE_SEARCH_CONFIG,
+                                RECIPE_SEARCH_MIN_STEM_LENGTH)
+from recipes.models import Recipe, RecipeIngredient
+
+WORD_PATTERN = re.compile(r'\w+')
+ENDING_PATTERN = re.compile(
+    r'(ами|ями|ого|его|ому|ему|ыми|ими|ах|ях|ов|ев|ей|ой|ий|ый|ая|яя|'
+    r'ое|ее|ые|ие|ом|ем|ам|ям|а|я|о|е|ы|и|у|ю|ь)$'
+)
+
+
+def get_stem(word):
+    stem = ENDING_PATTERN.sub('', word)
+    return stem if len(stem) >= RECIPE_SEARCH_MIN_STEM_LENGTH else word
+
+
+class PostgresRecipeSearch:
+
+    def update(self, recipe_ids):
+        ingredient_names = Subquery(
+            RecipeIngredient.objects.filter(
+                recipe=OuterRef('pk'), ingredient__isnull=False
+            ).order_by().values('recipe').annotate(
+                names=StringAgg('ingredient__name', ' ')
+            ).values('names')
+        )
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=(
+                SearchVector(
+                    'name', weight='A', config=RECIPE_SEARCH_CONFIG
+                )
+                + SearchVector(
+                    ingredient_names, weight='B', config=RECIPE_SEARCH_CONFIG
+                )
+                + SearchVector(
+                    'text', weight='C', config=RECIPE_SEARCH_CONFIG
+                )
+            )
+        )
+
+    def search(self, queryset, text):
+        query = SearchQuery(
+            text, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+
+class SqliteRecipeSearch:
+    table = 'recipes_recipe_fts'
+    weights = (10.0, 5.0, 1.0)
+
+    def update(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        ingredient_names = defaultdict(list)
+        for recipe_id, name in RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids, ingredient__isnull=False
+        ).order_by('id').values_list('recipe', 'ingredient__name'):
+            ingredient_names[recipe_id].append(name)
+        rows = [
+            (pk, name, ' '.join(ingredient_names[pk]), text)
+            for pk, name, text in Recipe.objects.filter(
+                pk__in=recipe_ids
+            ).values_list('pk', 'name', 'text')
+        ]
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})',
+                recipe_ids
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, ingredients, text) '
+                'VALUES (%s, %s, %s, %s)',
+                rows
+            )
+
+    def search(self, queryset, text):
+        words = [
+            get_stem(word) for word in WORD_PATTERN.findall(text.lower())
+        ]
+        if not words:
+            return queryset.annotate(search_rank=Value(0.0)).none()
+        match = ' '.join(f'"{word}"*' for word in words)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.extra(
+            select={'search_rank': f'-bm25({self.table}, {weights})'},
+            tables=(self.table, ),
+            where=(
+                f'{self.table}.rowid = {Recipe._meta.db_table}.id',
+                f'{self.table} MATCH %s',
+            ),
+            params=(match, )
+        )
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresRecipeSearch(),
+    'sqlite': SqliteRecipeSearch(),
+}
+
+
+def search_recipes(queryset, text):
+    return SEARCH_BACKENDS[connection.vendor].search(queryset, text)
+
+
+def update_search_index(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    backend = SEARCH_BACKENDS[connection.vendor]
+    for start in range(0, len(recipe_ids), RECIPE_SEARCH_CHUNK_SIZE):
+        backend.update(recipe_ids[start:start + RECIPE_SEARCH_CHUNK_SIZE])
+    return len(recipe_ids)
+
+
+pending_updates = Local()
+
+
+def get_pending_updates():
+    if not hasattr(pending_updates, 'recipe_ids'):
+        pending_updates.recipe_ids = set()
+    return pending_updates.recipe_ids
+
+
+def update_pending_search_index():
+    recipe_ids = get_pending_updates()
+    if not recipe_ids:
+        return
+    pending_updates.recipe_ids = set()
+    update_search_index(recipe_ids)
+
+
+def schedule_search_update(recipe_ids):
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    get_pending_updates().update(recipe_ids)
+    transaction.on_commit(update_pending_search_index)
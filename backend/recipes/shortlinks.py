@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from foodgram.constants import (SHORT_LINK_CACHE_SIZE, SHORT_LINK_NEGATIVE_TTL,
+                                SHORT_LINK_POSITIVE_TTL)
+from recipes.models import Recipe
+
+
+class RecipeIdCache:
+
+    def __init__(self, max_size, positive_ttl, negative_ttl):
+        self.max_size = max_size
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def exists(self, recipe_id):
+        now = monotonic()
+        exists = self._get(recipe_id, now)
+        if exists is None:
+            exists = Recipe.objects.filter(pk=recipe_id).exists()
+            self._set(recipe_id, exists, now)
+        return exists
+
+    async def aexists(self, recipe_id):
+        now = monotonic()
+        exists = self._get(recipe_id, now)
+        if exists is None:
+            exists = await Recipe.objects.filter(pk=recipe_id).aexists()
+            self._set(recipe_id, exists, now)
+        return exists
+
+    def discard(self, recipe_id):
+        with self._lock:
+            self._items.pop(recipe_id, None)
+
+    def _get(self, recipe_id, now):
+        with self._lock:
+            entry = self._items.get(recipe_id)
+            if entry is None or entry[1] <= now:
+                return None
+            self._items.move_to_end(recipe_id)
+            return entry[0]
+
+    def _set(self, recipe_id, exists, now):
+        with self._lock:
+            self._items[recipe_id] = (
+                exists,
+                now + (self.positive_ttl if exists else self.negative_ttl)
+            )
+            self._items.move_to_end(recipe_id)
+            if len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+recipe_id_cache = RecipeIdCache(
+    SHORT_LINK_CACHE_SIZE, SHORT_LINK_POSITIVE_TTL, SHORT_LINK_NEGATIVE_TTL
+)
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.counters import COUNTERS, update_counter
+from recipes.images import schedule_renditions
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import schedule_search_update
+from recipes.shortlinks import recipe_id_cache
+
+User = get_user_model()
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+def connect_counter(source, target, fk_name, field):
+
+    def increase(instance, created, **kwargs):
+        if created:
+            update_counter(target, getattr(instance, fk_name), field, 1)
+
+    def decrease(instance, **kwargs):
+        update_counter(target, getattr(instance, fk_name), field, -1)
+
+    post_save.connect(
+        increase, sender=source, weak=False, dispatch_uid=f'{field}_increase'
+    )
+    post_delete.connect(
+        decrease, sender=source, weak=False, dispatch_uid=f'{field}_decrease'
+    )
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_image_renditions(instance, **kwargs):
+    schedule_renditions(instance, 'image', 'image_renditions')
+
+
+@receiver(post_save, sender=User)
+def schedule_avatar_renditions(instance, **kwargs):
+    schedule_renditions(instance, 'avatar', 'avatar_renditions')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def discard_cached_recipe_id(instance, **kwargs):
+    recipe_id_cache.discard(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe_search(instance, update_fields, **kwargs):
+    if update_fields and not SEARCH_FIELDS & set(update_fields):
+        return
+    schedule_search_update((instance.pk, ))
+
+
+@receiver(post_delete, sender=Recipe)
+def update_deleted_recipe_search(instance, **kwargs):
+    schedule_search_update((instance.pk, ))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_recipe_ingredient_search(instance, **kwargs):
+    if instance.recipe_id is not None:
+        schedule_search_update((instance.recipe_id, ))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def update_ingredient_recipes_search(instance, **kwargs):
+    schedule_search_update(instance.recipes.values_list('pk', flat=True))
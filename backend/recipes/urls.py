@@ -1,11 +1,16 @@
+from django.conf import settings
 from django.urls import path, register_converter
 
 from recipes.converters import HexConverter
-from recipes.views import recipe_redirect
+from recipes.views import arecipe_redirect, recipe_redirect
 
 register_converter(HexConverter, 'hex')
 
 
 urlpatterns = [
-    path('<hex:recipe_id>', recipe_redirect, name='shortlink')
+    path(
+        '<hex:recipe_id>',
+        arecipe_redirect if settings.ASYNC_VIEWS else recipe_redirect,
+        name='shortlink'
+    )
 ]
@@ -1,10 +1,18 @@
 from django.http import HttpResponsePermanentRedirect
 
 from recipes.models import Recipe
+from recipes.shortlinks import recipe_id_cache
 
 
-def recipe_redirect(request, recipe_id):
-    recipe = Recipe.objects.filter(pk=recipe_id)
-    if not recipe.count():
+def get_redirect(recipe_id, exists):
+    if not exists:
         return HttpResponsePermanentRedirect('/not-found/')
-    return HttpResponsePermanentRedirect(recipe.first().get_absolute_url)
+    return HttpResponsePermanentRedirect(Recipe(pk=recipe_id).get_absolute_url)
+
+
+def recipe_redirect(request, recipe_id):
+    return get_redirect(recipe_id, recipe_id_cache.exists(recipe_id))
+
+
+async def arecipe_redirect(request, recipe_id):
+    return get_redirect(recipe_id, await recipe_id_cache.aexists(recipe_id))
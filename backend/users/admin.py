@@ -46,17 +46,13 @@ class UserAdmin(BaseUserAdmin):
     search_fields = ('username', 'first_name', 'email')
     add_fieldsets = USER_ADMIN_ADD_FIELDSET
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.prefetch_related('subscribes', 'recipes')
-
-    @admin.display(description='Подписчиков')
+    @admin.display(description='Подписчиков', ordering='followers_count')
     def total_subscribes(self, obj):
-        return obj.subscribes.count()
+        return obj.followers_count
 
-    @admin.display(description='Рецептов')
+    @admin.display(description='Рецептов', ordering='recipes_count')
     def total_recipes(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     @admin.display(description='Аватар')
     def avatar_field(self, obj):
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_renditions',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Версии аватара'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_user_avatar_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscribe',
+            index=models.Index(fields=['subscribe_to', 'user'], name='users_subscribe_followers_idx'),
+        ),
+    ]
@@ -31,6 +31,15 @@ class User(AbstractUser):
     )
     avatar = models.ImageField('Аватар', null=True,
                                default='', upload_to='users/')
+    avatar_renditions = models.JSONField(
+        'Версии аватара', default=dict, editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name']
 
 
@@ -59,6 +68,12 @@ class Subscribe(models.Model):
                 name='%(app_label)s_%(class)s_prevent_self_subscribe',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('subscribe_to', 'user'),
+                name='%(app_label)s_%(class)s_followers_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user}-{self.subscribe_to}'[:STR_OUTPUT_LIMIT]